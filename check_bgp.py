@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+# Name: check_bgp.py
+# Description: Nagios plugin to check the BGP state of every neighbor of a router with one
+#              bgpPeerTable/cbgpPeerAddrAcceptedPrefixes walk. Also returns total prefixes,
+#              received and sent messages as performance data
+#              Python replacement for check_bgp.sh
+# Requires: Python 3.6 or later, snmp_client.py, counter_store.py, rate_engine.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.1
+# Release date: 10/18/2026
+
+import sys, time
+import snmp_client
+
+# Nagios Status Codes
+OK = 0
+WARNING = 1
+CRITICAL = 2
+UNKNOWN = 3
+
+# bgpPeerTable (BGP4-MIB) columns, indexed by the neighbor address
+BGP_PEER_STATE = '1.3.6.1.2.1.15.3.1.2'
+BGP_PEER_ADMIN_STATUS = '1.3.6.1.2.1.15.3.1.3'
+BGP_PEER_REMOTE_AS = '1.3.6.1.2.1.15.3.1.9'
+BGP_PEER_IN_TOTAL_MESSAGES = '1.3.6.1.2.1.15.3.1.12'
+BGP_PEER_OUT_TOTAL_MESSAGES = '1.3.6.1.2.1.15.3.1.13'
+BGP_PEER_FSM_ESTABLISHED_TIME = '1.3.6.1.2.1.15.3.1.16'
+
+# cbgpPeerAddrAcceptedPrefixes (CISCO-BGP4-MIB), indexed by <neighbor>.<afi>.<safi>
+CBGP_PEER_ADDR_ACCEPTED_PREFIXES = '1.3.6.1.4.1.9.9.187.1.2.4.1.1'
+IPV4_UNICAST = '.1.1'
+
+COLUMNS = {'state': BGP_PEER_STATE,
+           'admin_status': BGP_PEER_ADMIN_STATUS,
+           'remote_as': BGP_PEER_REMOTE_AS,
+           'current_received': BGP_PEER_IN_TOTAL_MESSAGES,
+           'current_sent': BGP_PEER_OUT_TOTAL_MESSAGES,
+           'established_time': BGP_PEER_FSM_ESTABLISHED_TIME}
+
+# bgpPeerState values
+BGP_STATE = {1: 'idle', 2: 'connect', 3: 'active', 4: 'opensent', 5: 'openconfirm', 6: 'established'}
+
+# bgpPeerAdminStatus stop(1)
+ADMIN_STATUS_STOP = 1
+
+# A prefix drop is only reported when the average was at least this many prefixes
+DROP_MINIMUM_PREFIXES = 10
+
+def get_peers(args):
+    # One GetBulk walk over the peer table columns and the accepted prefixes
+    table = snmp_client.walk(args.hostname, args.community, list(COLUMNS.values()) + [CBGP_PEER_ADDR_ACCEPTED_PREFIXES],
+                             max_repetitions=args.max_repetitions, port=args.port, timeout=args.timeout)
+    timestamp = int(time.time())
+
+    peers = {}
+    for field, column in COLUMNS.items():
+        for oid, value in table[column]:
+            neighbor = oid[len(column) + 1:]
+            peers.setdefault(neighbor, {'timestamp': timestamp, 'prefixes': 0})[field] = value
+
+    for oid, value in table[CBGP_PEER_ADDR_ACCEPTED_PREFIXES]:
+        index = oid[len(CBGP_PEER_ADDR_ACCEPTED_PREFIXES) + 1:]
+        if index.endswith(IPV4_UNICAST) and index[:-len(IPV4_UNICAST)] in peers:
+            peers[index[:-len(IPV4_UNICAST)]]['prefixes'] = value
+
+    return(peers)
+
+def store_counters(args, peers):
+    import counter_store
+
+    # Same message counter objects as check_bgp.sh, so either plugin can take over. Accepted
+    # prefixes are kept as a gauge next to them. Returns {neighbor: (message history, prefix history)}
+    samples = {}
+    for neighbor, peer in peers.items():
+        if peer.get('current_received') is not None and peer.get('current_sent') is not None:
+            samples[f"bgp_{neighbor}"] = (peer['timestamp'], peer['current_received'], peer['current_sent'])
+        samples[f"bgp_prefixes_{neighbor}"] = (peer['timestamp'], peer['prefixes'], 0)
+    history = counter_store.update_history(f"{args.file}/{counter_store.DB_FILE}", args.hostname, samples)
+
+    return({neighbor: (history.get(f"bgp_{neighbor}", []), [sample[1] for sample in history[f"bgp_prefixes_{neighbor}"]])
+            for neighbor in peers})
+
+def format_established_time(seconds):
+    return(f"{seconds // 86400}d{seconds // 3600 % 24:02d}h{seconds // 60 % 60:02d}m{seconds % 60:02d}s")
+
+def do_perf_data(args, neighbor, peer, history):
+    import counter_store
+
+    # Messages received and sent are 32-bit counters, so they need the last value to determine the difference
+    previous = history[-1] if history else None
+    current = (peer['timestamp'], peer.get('current_received') or 0, peer.get('current_sent') or 0)
+    result = counter_store.deltas(previous, current, 32)
+
+    if args.verbose:
+        print(f"current_received={current[1]}, current_sent={current[2]}, previous={previous}")
+
+    if result is None:
+        return(None, None)
+
+    elapsed, received, sent = result
+    return(received, sent)
+
+def do_state(args, neighbor, peer, history):
+    state = peer.get('state')
+    remote_as = peer.get('remote_as')
+
+    if args.verbose:
+        print(f"neighbor={neighbor}, community={args.community}, hostname={args.hostname}, file={args.file}, warning={args.warning}, critical={args.critical}, verbose={args.verbose}")
+        print(f"state={state}, admin_status={peer.get('admin_status')}, remote_as={remote_as}, established_time={peer.get('established_time')}")
+
+    if peer.get('admin_status') == ADMIN_STATUS_STOP:
+        return(WARNING, f"WARNING - {neighbor} (AS{remote_as}) state is administratively down.")
+
+    if state not in BGP_STATE:
+        return(UNKNOWN, f"UNKNOWN - {neighbor} (AS{remote_as}) state is {state}.")
+
+    if state != 6:
+        return(CRITICAL, f"CRITICAL - {neighbor} (AS{remote_as}) state is {BGP_STATE[state]}({state}).")
+
+    import rate_engine
+
+    message_history, prefix_history = history
+    received, sent = do_perf_data(args, neighbor, peer, message_history)
+    if received is None:
+        return(UNKNOWN, f"UNKNOWN - {neighbor} (AS{remote_as}) value out of range")
+
+    # Perfdata labels carry the neighbor address when several peers are checked
+    prefix = f"{neighbor}_" if len(args.neighbor or []) != 1 else ''
+    prefixes = peer['prefixes']
+    trend = rate_engine.analyze_gauge(prefix_history, prefixes)
+    perfdata = f"{prefix}prefixes={prefixes}, {prefix}received={received}, {prefix}sent={sent}, {prefix}prefixes_avg={round(trend['ewma'])}"
+
+    if args.critical != 0 and prefixes < args.critical:
+        return(CRITICAL, f"CRITICAL - {neighbor} (AS{remote_as}) prefixes={prefixes} < {args.critical} | {perfdata}")
+
+    if args.warning != 0 and prefixes < args.warning:
+        return(WARNING, f"WARNING - {neighbor} (AS{remote_as}) prefixes={prefixes} < {args.warning} | {perfdata}")
+
+    # Sudden prefix drop: at least --drop percent below the recent average
+    if rate_engine.is_drop(trend['change'], trend['baseline'], args.drop, DROP_MINIMUM_PREFIXES):
+        return(WARNING, f"WARNING - {neighbor} (AS{remote_as}) prefixes={prefixes} dropped {-trend['change']:.0%} below average {round(trend['baseline'])} | {perfdata}")
+
+    # Normal output
+    established_time = format_established_time(peer.get('established_time') or 0)
+    return(OK, f"OK - {neighbor} (AS{remote_as}) state is established(6). Established for {established_time}. prefixes={prefixes}, received={received}, sent={sent} | {perfdata}")
+
+def check_peers(args):
+    import sqlite3
+
+    try:
+        peers = get_peers(args)
+        history = store_counters(args, peers)
+    except (OSError, sqlite3.Error, snmp_client.SnmpError) as e:
+        return([(UNKNOWN, f"UNKNOWN - {e}")])
+
+    # Every peer of the router unless neighbors are given
+    neighbors = args.neighbor or sorted(peers, key=snmp_client.oid_key)
+    if not neighbors:
+        return([(UNKNOWN, f"UNKNOWN - no BGP peers found on {args.hostname}")])
+
+    results = []
+    for neighbor in neighbors:
+        if neighbor not in peers:
+            results.append((UNKNOWN, f"ERROR - Neighbor {neighbor} not found."))
+        else:
+            results.append(do_state(args, neighbor, peers[neighbor], history[neighbor]))
+
+    return(results)
+
+def print_results(results):
+    # Nagios takes the status from the first line and perfdata only from after the first '|',
+    # so the worst result goes first and the perfdata of every neighbor is printed once, there.
+    # The other results follow as long output. Returns the worst status.
+    results = sorted(results, key=lambda result: result[0], reverse=True)
+    texts = []
+    perfdata = []
+    for status_code, output in results:
+        text, sep, data = output.partition(' | ')
+        texts.append(text)
+        if data:
+            perfdata.append(data)
+
+    print(texts[0] + (f" | {', '.join(perfdata)}" if perfdata else ''))
+    for text in texts[1:]:
+        print(text)
+    return(results[0][0])
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Check BGP state of every neighbor, returns total prefixes, received and sent messages as performance data', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-H', dest='hostname', required=True,
+                        help='host or IP address to query')
+    parser.add_argument('-C', dest='community', required=True,
+                        help='SNMP community name (2c)')
+    parser.add_argument('-n', dest='neighbor', action='append',
+                        help='neighbor address. May be repeated\nDefault is every neighbor of the router')
+    parser.add_argument('-f', dest='file', default='/tmp',
+                        help='directory of the counter database (default is /tmp/)')
+    parser.add_argument('-w', dest='warning', default=0, type=int,
+                        help='warning threshold (minimum prefixes)')
+    parser.add_argument('-c', dest='critical', default=0, type=int,
+                        help='critical threshold (minimum prefixes)')
+    parser.add_argument('-D', dest='drop', default=50, type=int,
+                        help='warn when prefixes drop this many percent below their recent average\n(default is 50, 0 disables)')
+    parser.add_argument('-p', dest='port', default=161, type=int,
+                        help='SNMP port (default is 161)')
+    parser.add_argument('-t', dest='timeout', default=2, type=float,
+                        help='SNMP timeout in seconds (default is 2)')
+    parser.add_argument('-r', dest='max_repetitions', default=25, type=int,
+                        help='GetBulk max-repetitions (default is 25)')
+    parser.add_argument('-v', dest='verbose', action='store_true',
+                        help='show verbose output')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    results = check_peers(args)
+
+    sys.exit(print_results(results))
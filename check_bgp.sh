@@ -1,9 +1,9 @@
 #!/bin/bash
 # Name: check_bgp.sh
 # Description: Nagios plugin to check BGP state. Also returns total prefixes, sent updates and received updates as performance data
-# Requires: net-snmp, net-snmp-utils
+# Requires: net-snmp, net-snmp-utils, python3, counter_store.py
 # Author: John McNally, jmcnally@acm.org
-# Release date: 9/9/2024
+# Release date: 10/18/2026
 
 function do_state() {
   # State info
@@ -49,31 +49,20 @@ function do_perf_data() {
   current_received=`snmpget -v1 -On -c $community $hostname .1.3.6.1.2.1.15.3.1.12.$neighbor | cut -d ':' -f 2 | sed 's/ *//'`
   current_sent=`snmpget -v1 -On -c $community $hostname .1.3.6.1.2.1.15.3.1.13.$neighbor | cut -d ':' -f 2 | sed 's/ *//'`
 
-  if [[ -e $file/check_bgp_${hostname}_${neighbor} ]]; then
-    last_output=`/bin/cat $file/check_bgp_${hostname}_${neighbor}`
-    last_sent=`echo $last_output | cut -f4 -d":"`
-    last_received=`echo $last_output | cut -f6 -d":"`
-  else
-    last_sent=0
-    last_received=0
-  fi
-
-  # Determine values
-  received=`expr $current_received - $last_received`
-  sent=`expr $current_sent - $last_sent`
+  # Store the sample and get the wrap-corrected deltas since the previous one (32-bit counters)
+  deltas=`$(dirname $0)/counter_store.py -b 32 $file/counters.db $hostname bgp_$neighbor $(date +%s) $current_received $current_sent`
 
-  # Write data file
-  echo "neighbor:$neighbor:sent:$current_sent:received:$current_received" > $file/check_bgp_${hostname}_${neighbor}
-
-  # Check for negative values (possible after a router reboot)
-  if [[ received -lt 0 ]] || [[ sent -lt 0 ]]; then
+  # Check for a counter reset (possible after a router reboot)
+  if [[ $deltas == 'reset' ]] || [[ $deltas == '' ]]; then
     echo "UNKNOWN - value out of range"
     exit $UNKNOWN
   fi
 
+  read elapsed received sent <<< "$deltas"
+
   # Output verbose
   if [[ $verbose == true ]]; then
-    echo "last_output=$last_output, last_sent=$last_sent, last_received=$last_received"
+    echo "current_sent=$current_sent, current_received=$current_received, elapsed=$elapsed"
   fi
 
   if [[ $warning -ne 0 ]]; then
@@ -100,7 +89,7 @@ function usage() {
     -n [neighbor]         interface description
 
   Optional arguments:
-    -f [file]             path to performance data temp file (default is /tmp/)
+    -f [file]             directory of the counter database (default is /tmp/)
     -w [warning]          warning threshold (bps)
     -c [critical]         critical threshold (bps)
     -v                    show verbose output
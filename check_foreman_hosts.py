@@ -3,156 +3,370 @@
 # Description: Nagios plugin to check status of Foreman hosts
 # Requires: Python 3.6 or later, python-argparse, python-requests
 # Author: John McNally, jmcnally@acm.org
-# Version: 1.01
-# Release date: 9/13/2023
+# Version: 1.5
+# Release date: 10/18/2026
 
-def perform_check(args):
-    from datetime import timedelta
-    import json
+import sys, traceback
+import http_probe
+
+# Nagios Status Codes
+OK = 0
+WARNING = 1
+CRITICAL = 2
+UNKNOWN = 3
+
+# Foreman host searches, already URL-encoded
+HOST_SEARCHES = {
+    'bad_hosts': 'last_report+%3E+%2230+minutes+ago%22+and+%28status.failed+%3E+0+or+status.failed_restarts+%3E+0%29+and+status.enabled+%3D+true',
+    'out_of_sync_hosts': 'last_report+%3C+%2230+minutes+ago%22+and+status.enabled+%3D+true'
+}
+
+def create_session(args):
     import requests
+    from requests.adapters import HTTPAdapter
     from requests.auth import HTTPBasicAuth
     from requests.packages.urllib3.exceptions import InsecureRequestWarning
     requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
-    # Nagios Status Codes
-    OK = 0
-    WARNING = 1
-    CRITICAL = 2
-    UNKNOWN = 3
+    # One session per Foreman server keeps the TLS connection alive between requests
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(args.user, args.password)
+    session.headers.update({'Content-Type': 'application/json'})
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=args.workers)
+    session.mount('https://', adapter)
+
+    return(session)
+
+def load_targets(args):
+    import argparse
+    import configparser
+
+    targets = []
+
+    # Targets from repeated -H flags share the command-line settings
+    for host in args.host:
+        target = argparse.Namespace(**vars(args))
+        target.host = host
+        targets.append(target)
+
+    # Each config file section is one target; missing keys fall back to the command line
+    if args.config:
+        config_object = configparser.ConfigParser(interpolation=None)
+        try:
+            with open(args.config, "r") as file_object:
+                config_object.read_file(file_object)
+            for section in config_object.sections():
+                target = argparse.Namespace(**vars(args))
+                target.host = config_object.get(section, 'host', fallback=section)
+                target.user = config_object.get(section, 'user', fallback=args.user)
+                target.password = config_object.get(section, 'password', fallback=args.password)
+                target.warn = config_object.getfloat(section, 'warn', fallback=args.warn)
+                target.critical = config_object.getfloat(section, 'critical', fallback=args.critical)
+                target.nagios_host = config_object.get(section, 'nagios_host', fallback=args.nagios_host)
+                target.service = config_object.get(section, 'service', fallback=args.service)
+                targets.append(target)
+        except configparser.Error as e:
+            raise ValueError(f"{args.config}: {e}")
+
+    for target in targets:
+        if not target.user or not target.password:
+            raise ValueError(f"user and password are required for {target.host}")
+
+    return(targets)
+
+def check_targets(args, targets, sessions):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Check every target concurrently, at most --parallel at a time
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        futures = [executor.submit(run_check, target, session) for target, session in zip(targets, sessions)]
+        return([future.result() for future in futures])
+
+def perform_check(args):
+    targets = load_targets(args)
+    sessions = [create_session(target) for target in targets]
+    results = check_targets(args, targets, sessions)
+
+    # Print one result line per target and exit with the worst status code
+    for target, (status_code, output) in zip(targets, results):
+        if len(targets) == 1:
+            print(output)
+        else:
+            print(f"{target.host}: {output}")
+    sys.exit(max(status_code for status_code, output in results))
+
+def run_check(args, session):
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import timedelta
+    import json
 
     # Variables
     host = args.host
-    user = args.user
-    password = args.password
     timeout = args.timeout
     warn = args.warn
     critical = args.critical
     out_of_sync_threshold = 4
     rt_output = ''
     h_string = ''
+    perfdata = ''
     url = f"https://{host}/api/v2/dashboard"
 
-    # Send the request
     try:
-        r = requests.get(url=url,
-                         auth=HTTPBasicAuth(user, password),
-                         verify=False,
-                         timeout=timeout,
-                         headers={'Content-Type': 'application/json'})
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # The host searches are expensive, so one is only sent when the dashboard reports
+            # bad or out-of-sync hosts; a healthy check is a single dashboard request
+            if args.probes > 1:
+                # Thresholds apply to the chosen percentile of the probes' total time
+                summary, text = probe_dashboard(args)
+                elapsed = timedelta(seconds=summary[f"total_{args.percentile}"])
+                perfdata = " | " + http_probe.perfdata(summary, f"total_{args.percentile}", warn, critical)
+                rt_label = f"{args.percentile} response time over {args.probes} probes"
+            else:
+                r = session.get(url=url, verify=False, timeout=timeout)
+                r.raise_for_status()
+                elapsed = r.elapsed
+                text = r.text
+                rt_label = "response time"
+
+            # Format the response elapsed time
+            if warn != 0 or critical != 0:
+                rt_output = "in {0:.3f} seconds {1}".format(elapsed.total_seconds(), rt_label)
+                if args.verbose:
+                    print(f"Request completed {rt_output}")
+
+            # Parse the response text as JSON
+            dashboard = json.loads(text)
+
+            if args.verbose:
+                print("dashboard: ",dashboard)
+                print("total: ",dashboard['total_hosts'])
+                print("ok: ",dashboard['ok_hosts'])
+                print("oos: ",dashboard['out_of_sync_hosts'])
+                print("bad: ",dashboard['bad_hosts'])
+
+            if int(dashboard['bad_hosts']) != 0:
+                h_string = get_hostnames(args, session, executor, status='bad_hosts')
+            elif int(dashboard['out_of_sync_hosts']) > out_of_sync_threshold:
+                h_string = get_hostnames(args, session, executor, status='out_of_sync_hosts')
     except:
         exc_type, exc_value, exc_traceback = sys.exc_info()
         if args.verbose:
             lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
             print(''.join('!! ' + line for line in lines))
-        else:
-            print(f"FOREMAN CRITICAL - {exc_value}")
-        sys.exit(CRITICAL)
-
-    # Format the response elapsed time
-    if warn != 0 or critical != 0:
-        rt_output = "in {0:.3f} seconds response time".format(float(r.elapsed.seconds) + float(r.elapsed.microseconds) / 1000000)
-        if args.verbose:
-            print(f"Request completed {rt_output}")
-
-    # Parse the response text as JSON
-    dashboard = json.loads(r.text)
-
-    if args.verbose:
-        print("dashboard: ",dashboard)
-        print("total: ",dashboard['total_hosts'])
-        print("ok: ",dashboard['ok_hosts'])
-        print("oos: ",dashboard['out_of_sync_hosts'])
-        print("bad: ",dashboard['bad_hosts'])
+        return(CRITICAL, f"FOREMAN CRITICAL - {exc_value}")
 
     # Return the Nagios status code and summary
     if int(dashboard['bad_hosts']) != 0:
-        h_string = get_hostnames(args, status='bad_hosts')
-        print(f"FOREMAN CRITICAL - {dashboard['bad_hosts']} host(s) in error state: {h_string}")
-        sys.exit(CRITICAL)
+        return(CRITICAL, f"FOREMAN CRITICAL - {dashboard['bad_hosts']} host(s) in error state: {h_string}{perfdata}")
     elif int(dashboard['out_of_sync_hosts']) > out_of_sync_threshold:
-        h_string = get_hostnames(args, status='out_of_sync_hosts')
-        print(f"FOREMAN WARNING - {dashboard['out_of_sync_hosts']} host(s) out-of-sync: {h_string}")
-        sys.exit(WARNING)
+        return(WARNING, f"FOREMAN WARNING - {dashboard['out_of_sync_hosts']} host(s) out-of-sync: {h_string}{perfdata}")
     else:
         if warn == 0 and critical == 0:
-            print(f"FOREMAN OK - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total")
-            sys.exit(OK)
-        elif r.elapsed <= timedelta(seconds=warn):
-            print(f"FOREMAN OK - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output}")
-            sys.exit(OK)
-        elif r.elapsed <= timedelta(seconds=critical):
-            print(f"FOREMAN WARNING - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output} (> {warn} seconds)")
-            sys.exit(WARNING)
-        elif r.elapsed > timedelta(seconds=critical):
-            print(f"FOREMAN CRITICAL - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output} (> {critical} seconds)")
-            sys.exit(CRITICAL)
-
-def get_hostnames(args, status=''):
+            return(OK, f"FOREMAN OK - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total{perfdata}")
+        elif elapsed <= timedelta(seconds=warn):
+            return(OK, f"FOREMAN OK - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output}{perfdata}")
+        elif elapsed <= timedelta(seconds=critical):
+            return(WARNING, f"FOREMAN WARNING - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output} (> {warn} seconds){perfdata}")
+        else:
+            return(CRITICAL, f"FOREMAN CRITICAL - {dashboard['ok_hosts']} host(s) OK of {dashboard['total_hosts']} total {rt_output} (> {critical} seconds){perfdata}")
+
+def probe_dashboard(args):
+    import base64
+
+    # Send --probes dashboard requests over one kept-alive connection
+    credentials = base64.b64encode(f"{args.user}:{args.password}".encode()).decode()
+    headers = {'Authorization': f"Basic {credentials}", 'Content-Type': 'application/json'}
+    samples, status, content = http_probe.probe(args.host, 'GET', '/api/v2/dashboard',
+                                                headers=headers,
+                                                count=args.probes,
+                                                timeout=args.timeout)
+    if status != 200:
+        raise ValueError(f"dashboard request returned HTTP {status}")
+
+    return(http_probe.summarize(samples), content.decode())
+
+def get_hostnames(args, session, executor, status=''):
+    import math
+
+    # The first page gives the number of hosts, the remaining pages are fetched concurrently
+    page, names = get_hosts_page(args, session, status, 1)
+    subtotal = int(page['subtotal'])
+    pages = math.ceil(subtotal / int(page['per_page']))
+    if args.max_hosts:
+        pages = min(pages, math.ceil(args.max_hosts / int(page['per_page'])))
+    futures = [executor.submit(get_hosts_page, args, session, status, n) for n in range(2, pages + 1)]
+    for future in futures:
+        names.extend(future.result()[1])
+
+    if args.verbose:
+        print(f"{status} hosts: {names}")
+
+    # Only the first --max-hosts names are listed, followed by a count of the rest
+    if args.max_hosts and subtotal > args.max_hosts:
+        return ' '.join(names[:args.max_hosts]) + f" (+{subtotal - args.max_hosts} more)"
+    return ' '.join(names)
+
+def get_hosts_page(args, session, status, page):
+    url = f"https://{args.host}/api/v2/hosts?search={HOST_SEARCHES[status]}"
+    per_page = args.per_page
+    if args.max_hosts:
+        per_page = min(per_page, args.max_hosts)
+
+    # Send the request; thin results carry only the host id and name
+    with session.get(url=url,
+                     params={'page': page, 'per_page': per_page, 'thin': 'true'},
+                     verify=False,
+                     timeout=args.timeout,
+                     stream=True) as r:
+        return parse_hosts_page(r, args.max_hosts)
+
+def parse_hosts_page(r, limit=0):
+    import codecs
     import json
-    import requests
-    from requests.auth import HTTPBasicAuth
-    from requests.packages.urllib3.exceptions import InsecureRequestWarning
-    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
-    # Nagios Status Codes
-    OK = 0
-    WARNING = 1
-    CRITICAL = 2
-    UNKNOWN = 3
+    # Parse the response body incrementally, keeping the top-level fields
+    # and only the names from the results array
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = r.iter_content(chunk_size=65536)
+    buffer = ''
+    pos = 0
+    eof = False
+    page = {}
+    names = []
 
-    # Variables
-    host = args.host
-    user = args.user
-    password = args.password
-    timeout = args.timeout
-    h_string = ''
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + utf8.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
 
-    if status == 'bad_hosts':
-        url = f"https://{host}/api/v2/hosts?search=last_report+%3E+%2230+minutes+ago%22+and+%28status.failed+%3E+0+or+status.failed_restarts+%3E+0%29+and+status.enabled+%3D+true"
-    elif status == 'out_of_sync_hosts':
-        url = f"https://{host}/api/v2/hosts?search=last_report+%3C+%2230+minutes+ago%22+and+status.enabled+%3D+true"
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                raise ValueError('unexpected end of Foreman response')
+            fill()
 
-    # Send the request
-    try:
-        r = requests.get(url=url,
-                         auth=HTTPBasicAuth(user, password),
-                         verify=False,
-                         timeout=timeout,
-                         headers={'Content-Type': 'application/json'})
-    except:
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        if args.verbose:
-            lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
-            print(''.join('!! ' + line for line in lines))
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"expected '{char}' in Foreman response")
+        pos += 1
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            # A value ending at the end of the buffer may be truncated, e.g. a number
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    expect('{')
+    while peek() != '}':
+        key = value()
+        expect(':')
+        if key == 'results':
+            expect('[')
+            while peek() != ']':
+                names.append(value()['name'])
+                if limit and len(names) >= limit:
+                    return(page, names)
+                if peek() == ',':
+                    pos += 1
+            expect(']')
         else:
-            print(f"FOREMAN CRITICAL - {exc_value}")
-        sys.exit(CRITICAL)
+            page[key] = value()
+        if peek() == ',':
+            pos += 1
 
-    # Parse the response text as JSON
-    hosts = json.loads(r.text)['results']
-    if args.verbose:
-        print(f"{status} hosts: {hosts}")
-    for h in hosts:
-        h_string = h_string + h['name'] + ' '
+    return(page, names)
+
+def run_daemon(args):
+    import time
 
-    return h_string
+    # Keep the sessions open and submit passive results every interval
+    targets = load_targets(args)
+    sessions = [create_session(target) for target in targets]
+    while True:
+        started = time.time()
+        results = check_targets(args, targets, sessions)
+        if args.verbose:
+            for status_code, output in results:
+                print(output)
+        submit_results(args, targets, results)
+        time.sleep(max(0, args.interval - (time.time() - started)))
+
+def submit_results(args, targets, results):
+    import time
+
+    commands = ''
+    for target, (status_code, output) in zip(targets, results):
+        nagios_host = target.nagios_host or target.host
+        commands += f"[{int(time.time())}] PROCESS_SERVICE_CHECK_RESULT;{nagios_host};{target.service};{status_code};{output}\n"
+
+    # Write one passive check result per target to the Nagios external command file
+    try:
+        with open(args.command_file, 'w') as command_file:
+            command_file.write(commands)
+    except OSError as e:
+        print(f"ERROR: Unable to write to {args.command_file}: {e}", file=sys.stderr)
 
 def define_parser():
     import argparse
     parser = argparse.ArgumentParser(description='Check status of Foreman hosts', formatter_class=argparse.RawTextHelpFormatter)
 
-    parser.add_argument('-H', '--host', required=True,
-                        help='hostname or IP address of server')
-    parser.add_argument('-u', '--user', required=True,
+    parser.add_argument('-H', '--host', action='append', default=[],
+                        help='hostname or IP address of server. May be repeated to check several servers')
+    parser.add_argument('-f', '--config', default=None,
+                        help='config file with one section per server\nKeys: host, user, password, warn, critical, nagios_host, service')
+    parser.add_argument('-u', '--user', default=None,
                         help='username for authentication to server\nNOTE: Use a low-privilege admin account for this purpose')
-    parser.add_argument('-p', '--password', required=True,
+    parser.add_argument('-p', '--password', default=None,
                         help='password for authentication to server')
-    parser.add_argument('-t', '--timeout', default=10,
+    parser.add_argument('-t', '--timeout', default=10, type=float,
                         help='connection timeout. Default is 10 seconds')
     parser.add_argument('-w', '--warn', default=0, type=float,
                         help='warning threshold for request duration in seconds')
     parser.add_argument('-c', '--critical', default=0, type=float,
                         help='critical threshold for request duration in seconds')
+    parser.add_argument('-n', '--probes', default=1, type=int,
+                        help='number of dashboard requests sent over one connection to measure latency\nDefault is 1')
+    parser.add_argument('--percentile', default='p95', choices=http_probe.PERCENTILES,
+                        help='percentile of the probes compared with --warn and --critical. Default is p95')
+    parser.add_argument('-W', '--workers', default=8, type=int,
+                        help='maximum number of concurrent requests to the server. Default is 8')
+    parser.add_argument('-P', '--parallel', default=4, type=int,
+                        help='maximum number of servers checked concurrently. Default is 4')
+    parser.add_argument('--per-page', default=100, type=int,
+                        help='number of hosts requested per page of search results. Default is 100')
+    parser.add_argument('-m', '--max-hosts', default=0, type=int,
+                        help='maximum number of host names listed. Default is 0 (all hosts)')
+    parser.add_argument('-D', '--daemon', action='store_true',
+                        help='run continuously and submit passive check results to Nagios')
+    parser.add_argument('-i', '--interval', default=60, type=float,
+                        help='seconds between checks in daemon mode. Default is 60 seconds')
+    parser.add_argument('--command-file', default='/var/spool/nagios/cmd/nagios.cmd',
+                        help='Nagios external command file for passive check results\nDefault is /var/spool/nagios/cmd/nagios.cmd')
+    parser.add_argument('--nagios-host', default=None,
+                        help='host name of the passive service in Nagios. Default is the server hostname')
+    parser.add_argument('--service', default='Foreman Hosts',
+                        help='description of the passive service in Nagios. Default is "Foreman Hosts"')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='increase output verbosity')
     parser.set_defaults(func=perform_check)
@@ -160,12 +374,22 @@ def define_parser():
     return(parser)
 
 if __name__ == '__main__':
-    import sys, traceback
-
     parser = define_parser()
     args = parser.parse_args()
 
     if args.verbose:
         print (args)
 
-    args.func(args)
+    if not args.host and not args.config:
+        parser.error('at least one -H/--host or -f/--config is required')
+
+    if args.daemon:
+        args.func = run_daemon
+
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"FOREMAN UNKNOWN - {e}")
+        sys.exit(UNKNOWN)
+    except KeyboardInterrupt:
+        sys.exit(OK)
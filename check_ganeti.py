@@ -3,11 +3,12 @@
 # Description: Nagios plugin to check Ganeti service status
 # Requires: Python 3.6 or later
 # Author: John McNally, jmcnally@acm.org
-# Version: 1.0
-# Release date: 9/15/2023
+# Version: 1.3
+# Release date: 10/18/2026
 
-import platform, re, sys, traceback
+import platform, re, sys, time, traceback
 from subprocess import getoutput
+import ganeti_facts
 
 # Nagios Status Codes
 OK=0
@@ -19,6 +20,9 @@ UNKNOWN=3
 active_count=0
 status_code=OK
 output_text=""
+perf_text=""
+long_text=""
+summary_text=""
 os_major_version=""
 ganeti_major_version=""
 role_text=""
@@ -26,8 +30,9 @@ role_text=""
 def do_systemd():
     global active_count
     global output_text
+    global perf_text
+    global long_text
     global status_code
-    status_text=""
 
     if role_text == 'master':
         services = ['ganeti-luxid',
@@ -41,14 +46,28 @@ def do_systemd():
     if ganeti_major_version == 2:
         services.insert(0, 'ganeti-confd')
 
-    for service in services:
-        status_text = getoutput(f"systemctl show {service} -p SubState").split("=")[1].lower()
-#        print(f"{service}: {status_text}")
-        if status_text == 'running':
+    # One systemctl call returns a block of properties per unit, in the order requested
+    properties = "Id,ActiveState,SubState,NRestarts,ActiveEnterTimestampMonotonic"
+    blocks = getoutput(f"systemctl show {' '.join(services)} -p {properties}").strip().split("\n\n")
+    now = time.monotonic()
+
+    for service, block in zip(services, blocks):
+        unit = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        active_state = unit.get('ActiveState', 'unknown').lower()
+        sub_state = unit.get('SubState', 'unknown').lower()
+        restarts = unit.get('NRestarts') or '0'  # NRestarts requires systemd 235 or later
+        entered = int(unit.get('ActiveEnterTimestampMonotonic') or 0)
+        uptime = int(now - entered / 1000000) if entered else 0
+
+        perf_text = f"{perf_text} {service}_restarts={restarts} {service}_uptime={uptime}s"
+        long_text = f"{long_text}\n{service}: {active_state}/{sub_state}, {restarts} restart(s)"
+        if active_state == 'active':
+            long_text = f"{long_text}, active for {uptime} seconds"
+        if sub_state == 'running':
             active_count += 1
         else:
             status_code = CRITICAL
-            output_text = f"{output_text} {service} {status_text};"
+            output_text = f"{output_text} {service} {active_state}/{sub_state};"
 
 def do_initd():
     global active_count
@@ -73,15 +92,147 @@ def do_initd():
             status_code = CRITICAL
             output_text = f"{output_text} {service} {status_text};"
 
+def rapi_get(args, resource):
+    import base64, json, ssl
+    import urllib.request
+
+    # The RAPI certificate is normally self-signed
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+
+    request = urllib.request.Request(f"https://{args.host}:{args.port}{resource}")
+    if args.user:
+        credentials = base64.b64encode(f"{args.user}:{args.password}".encode()).decode()
+        request.add_header('Authorization', f"Basic {credentials}")
+
+    with urllib.request.urlopen(request, timeout=args.timeout, context=context) as response:
+        return json.load(response)
+
+def check_noded(args, node):
+    import socket
+
+    # Time a TCP connection to ganeti-noded, or None if it is unreachable
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((node, args.noded_port), args.timeout):
+            return time.perf_counter() - started
+    except OSError:
+        return None
+
+def do_cluster(args):
+    global active_count
+    global output_text
+    global perf_text
+    global long_text
+    global status_code
+    global summary_text
+    from concurrent.futures import ThreadPoolExecutor
+
+    def warn(text):
+        global output_text
+        global status_code
+        output_text = f"{output_text} {text};"
+        if status_code == OK:
+            status_code = WARNING
+
+    def critical(text):
+        global output_text
+        global status_code
+        output_text = f"{output_text} {text};"
+        status_code = CRITICAL
+
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        # Query the RAPI for nodes, instances and jobs at the same time
+        try:
+            nodes = executor.submit(rapi_get, args, '/2/nodes?bulk=1')
+            instances = executor.submit(rapi_get, args, '/2/instances?bulk=1')
+            jobs = executor.submit(rapi_get, args, '/2/jobs?bulk=1')
+            nodes, instances, jobs = nodes.result(), instances.result(), jobs.result()
+        except Exception as e:
+            critical(f"RAPI {args.host}: {e}")
+            return
+
+        # Check ganeti-noded on every online node in parallel
+        online = [node['name'] for node in nodes if not node.get('offline')]
+        latencies = dict(zip(online, executor.map(lambda node: check_noded(args, node), online)))
+
+    for node in nodes:
+        name = node['name']
+        if node.get('offline'):
+            warn(f"{name} offline")
+            long_text = f"{long_text}\n{name}: offline"
+        elif latencies[name] is None:
+            critical(f"{name} ganeti-noded unreachable")
+            long_text = f"{long_text}\n{name}: ganeti-noded unreachable"
+        else:
+            active_count += 1
+            perf_text = f"{perf_text} {name}_noded={latencies[name]:.3f}s"
+            long_text = f"{long_text}\n{name}: ganeti-noded {latencies[name]:.3f} seconds"
+            if node.get('drained'):
+                warn(f"{name} drained")
+
+    running = 0
+    for instance in instances:
+        if instance.get('status') == 'running':
+            running += 1
+        elif str(instance.get('status')).startswith('ERROR_'):
+            critical(f"{instance['name']} {instance['status']}")
+
+    failed_jobs = [job for job in jobs if job.get('status') == 'error']
+    if failed_jobs:
+        warn(f"{len(failed_jobs)} failed job(s)")
+
+    perf_text = f"{perf_text} nodes_online={active_count} instances={len(instances)} instances_running={running} jobs={len(jobs)} jobs_failed={len(failed_jobs)}"
+    summary_text = f"{active_count} of {len(nodes)} node(s) online, {running} of {len(instances)} instance(s) running, {len(failed_jobs)} failed job(s)"
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Check Ganeti service status', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-C', '--cluster', action='store_true',
+                        help='check the whole cluster through the RAPI instead of the local node')
+    parser.add_argument('-H', '--host', default='localhost',
+                        help='RAPI hostname or IP address, normally the cluster name. Default is localhost')
+    parser.add_argument('--port', default=5080, type=int,
+                        help='RAPI port. Default is 5080')
+    parser.add_argument('-u', '--user', default=None,
+                        help='username for RAPI authentication, if required')
+    parser.add_argument('-p', '--password', default=None,
+                        help='password for RAPI authentication')
+    parser.add_argument('--noded-port', default=1811, type=int,
+                        help='ganeti-noded port checked on every node. Default is 1811')
+    parser.add_argument('-P', '--parallel', default=16, type=int,
+                        help='maximum number of nodes checked concurrently. Default is 16')
+    parser.add_argument('-t', '--timeout', default=10, type=float,
+                        help='connection timeout. Default is 10 seconds')
+
+    return(parser)
+
 if __name__ == '__main__':
-    file = open(r"/etc/redhat-release", "r")
-    os_major_version = int(re.findall('[0-9]', file.readline())[0])
+    args = define_parser().parse_args()
+
+    if args.cluster:
+        do_cluster(args)
 
-    file = open(r"/var/lib/ganeti/ssconf_release_version", "r")
-    ganeti_major_version = int(re.findall('[0-9]', file.readline())[0])
+        if perf_text:
+            perf_text = f" |{perf_text}"
 
-    file = open(r"/var/lib/ganeti/ssconf_master_node", "r")
-    if platform.node() == file.readline().strip():
+        if status_code == OK:
+            print(f"GANETI OK - {summary_text}{perf_text}{long_text}")
+        elif status_code == WARNING:
+            print(f"GANETI WARNING -{output_text}{perf_text}{long_text}")
+        elif status_code == CRITICAL:
+            print(f"GANETI CRITICAL -{output_text}{perf_text}{long_text}")
+
+        sys.exit(status_code)
+
+    # OS and Ganeti facts are only parsed again when their files change
+    facts = ganeti_facts.load()
+    os_major_version = facts['os_major_version']
+    ganeti_major_version = facts['ganeti_major_version']
+
+    if platform.node() == facts['master_node']:
         role_text = 'master'
     else:
         role_text = 'non-master'
@@ -94,9 +245,12 @@ if __name__ == '__main__':
         print("GANETI UNKNOWN - OS version unsupported")
         status_code = UNKNOWN
 
+    if perf_text:
+        perf_text = f" |{perf_text}"
+
     if status_code == OK:
-        print(f"GANETI OK - {active_count} service(s) active on {role_text} node")
+        print(f"GANETI OK - {active_count} service(s) active on {role_text} node{perf_text}{long_text}")
     elif status_code == CRITICAL:
-        print(f"GANETI CRITICAL -{output_text}")
+        print(f"GANETI CRITICAL -{output_text}{perf_text}{long_text}")
 
     sys.exit(status_code)
@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+# Name: check_interface.py
+# Description: Nagios plugin to check interface status, returns sent and
+#              received bits per second as performance data
+#              Python replacement for check_interface.sh using one SNMP GetRequest per check
+# Requires: Python 3.6 or later, snmp_client.py, counter_store.py, rate_engine.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.3
+# Release date: 10/18/2026
+
+import sys, time
+import snmp_client
+
+# Nagios Status Codes
+OK = 0
+WARNING = 1
+CRITICAL = 2
+UNKNOWN = 3
+
+# Interface OIDs
+SYS_UPTIME = '1.3.6.1.2.1.1.3.0'
+IF_TABLE_LAST_CHANGE = '1.3.6.1.2.1.31.1.5.0'
+IF_DESCR = '1.3.6.1.2.1.2.2.1.2'
+IF_ADMIN_STATUS = '1.3.6.1.2.1.2.2.1.7'
+IF_OPER_STATUS = '1.3.6.1.2.1.2.2.1.8'
+IF_HC_IN_OCTETS = '1.3.6.1.2.1.31.1.1.1.6'
+IF_HC_OUT_OCTETS = '1.3.6.1.2.1.31.1.1.1.10'
+
+# ifAdminStatus/ifOperStatus values
+IF_STATUS = {1: 'up', 2: 'down', 3: 'testing', 4: 'unknown', 5: 'dormant', 6: 'notPresent', 7: 'lowerLayerDown'}
+
+# A traffic cliff is only reported when the average was at least this rate
+CLIFF_MINIMUM_BPS = 1000000
+
+def get_ifindexes(args):
+    # Walk ifDescr once and map every description to its ifIndex
+    ifindexes = {}
+    column = snmp_client.walk(args.hostname, args.community, [IF_DESCR], port=args.port, timeout=args.timeout)[IF_DESCR]
+    for oid, descr in column:
+        if descr not in ifindexes:
+            ifindexes[descr] = int(oid.rsplit('.', 1)[1])
+
+    return(ifindexes)
+
+def load_index_cache(args):
+    import json
+
+    try:
+        with open(f"{args.file}/check_interface_index_{args.hostname}", "r") as file:
+            return(json.load(file))
+    except (OSError, ValueError):
+        return({})
+
+def save_index_cache(args, cache):
+    import json, os, tempfile
+
+    # Write to a temporary file and rename it, so readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=args.file, prefix=f"check_interface_index_{args.hostname}.")
+    try:
+        with open(fd, "w") as file:
+            json.dump(cache, file)
+        os.replace(temp_path, f"{args.file}/check_interface_index_{args.hostname}")
+    except OSError:
+        os.unlink(temp_path)
+        raise
+
+def get_status(args, ifindexes):
+    # One GetRequest carries sysUpTime, ifTableLastChange and, for every interface,
+    # ifDescr (to confirm the cached index) and the four status OIDs
+    oids = [SYS_UPTIME, IF_TABLE_LAST_CHANGE]
+    for ifindex in ifindexes.values():
+        oids += [f"{IF_DESCR}.{ifindex}", f"{IF_ADMIN_STATUS}.{ifindex}", f"{IF_OPER_STATUS}.{ifindex}",
+                 f"{IF_HC_IN_OCTETS}.{ifindex}", f"{IF_HC_OUT_OCTETS}.{ifindex}"]
+    values = snmp_client.get(args.hostname, args.community, oids, port=args.port, timeout=args.timeout)
+    timestamp = int(time.time())
+
+    status = {}
+    for descr, ifindex in ifindexes.items():
+        status[descr] = {'ifindex': ifindex,
+                         'timestamp': timestamp,
+                         'descr': values.get(f"{IF_DESCR}.{ifindex}"),
+                         'ifadminstatus': IF_STATUS.get(values.get(f"{IF_ADMIN_STATUS}.{ifindex}"), 'unknown'),
+                         'ifstatus': IF_STATUS.get(values.get(f"{IF_OPER_STATUS}.{ifindex}"), 'unknown'),
+                         'received': values.get(f"{IF_HC_IN_OCTETS}.{ifindex}"),
+                         'sent': values.get(f"{IF_HC_OUT_OCTETS}.{ifindex}")}
+
+    return(status, values.get(SYS_UPTIME), values.get(IF_TABLE_LAST_CHANGE))
+
+def get_cached_status(args):
+    # Use the cached ifIndexes unless an interface is not in the cache (it may have been
+    # added since, and not every agent has ifTableLastChange), the device rebooted
+    # (sysUpTime went backwards), the interface table changed or an ifDescr no longer matches
+    cache = load_index_cache(args)
+    if cache and all(descr in cache['ifindexes'] for descr in args.descr):
+        ifindexes = {descr: cache['ifindexes'][descr] for descr in args.descr}
+        status, sysuptime, lastchange = get_status(args, ifindexes)
+        if (sysuptime is not None and sysuptime >= cache['sysuptime'] and
+            lastchange == cache['iftablelastchange'] and
+            all(interface['descr'] == descr for descr, interface in status.items())):
+            return(status)
+    if cache and args.verbose:
+        print(f"Index cache for {args.hostname} is stale, rebuilding")
+
+    # Rebuild the index cache from a full ifDescr walk
+    all_ifindexes = get_ifindexes(args)
+    ifindexes = {descr: all_ifindexes[descr] for descr in args.descr if descr in all_ifindexes}
+    status, sysuptime, lastchange = get_status(args, ifindexes)
+    if sysuptime is not None:
+        save_index_cache(args, {'sysuptime': sysuptime, 'iftablelastchange': lastchange, 'ifindexes': all_ifindexes})
+
+    return(status)
+
+def store_counters(args, interfaces):
+    import counter_store
+
+    # Store the counters of all interfaces in one transaction; returns {ifindex: sample history}
+    samples = {f"interface_{interface['ifindex']}": (interface['timestamp'], interface['received'], interface['sent'])
+               for interface in interfaces if interface['received'] is not None and interface['sent'] is not None}
+    history = counter_store.update_history(f"{args.file}/{counter_store.DB_FILE}", args.hostname, samples)
+
+    return({interface['ifindex']: history.get(f"interface_{interface['ifindex']}", []) for interface in interfaces})
+
+def do_perf_data(args, interface, history):
+    import rate_engine
+
+    # ifHCInOctets/ifHCOutOctets are 64-bit counters
+    current = (interface['timestamp'], interface['received'] or 0, interface['sent'] or 0)
+    rates = rate_engine.analyze_counter(history, current, 64)
+
+    if args.verbose:
+        print(f"current_date={current[0]}, current_sent={current[2]}, current_received={current[1]}")
+        if history:
+            print(f"last_date={history[-1][0]}, last_sent={history[-1][2]}, last_received={history[-1][1]}, samples={len(history)}")
+
+    # A counter reset (router reboot, cleared counters) has no meaningful rate; wraps are handled
+    if rates is None:
+        return(None)
+
+    return({'received_bps': int(rates['rate_in'] * 8),
+            'sent_bps': int(rates['rate_out'] * 8),
+            'received_bps_avg': int(rates['ewma_in'] * 8),
+            'sent_bps_avg': int(rates['ewma_out'] * 8),
+            'baseline_received_bps': rates['baseline_in'] and rates['baseline_in'] * 8,
+            'baseline_sent_bps': rates['baseline_out'] and rates['baseline_out'] * 8,
+            'change_received': rates['change_in'],
+            'change_sent': rates['change_out']})
+
+def do_status(args, descr, interface, history=None):
+    ifindex = interface['ifindex']
+
+    if args.verbose:
+        print(f"descr={descr}, community={args.community}, hostname={args.hostname}, file={args.file}, warning={args.warning}, critical={args.critical}, verbose={args.verbose}")
+        print(f"ifindex={ifindex}, ifadminstatus={interface['ifadminstatus']}, ifstatus={interface['ifstatus']}")
+
+    if interface['ifadminstatus'] == 'down':
+        return(WARNING, f"WARNING - Interface {descr} (index {ifindex}) is administratively down.")
+
+    if interface['ifstatus'] == 'down':
+        return(CRITICAL, f"CRITICAL - Interface {descr} (index {ifindex}) is down.")
+
+    import rate_engine
+
+    rates = do_perf_data(args, interface, history or [])
+    if rates is None:
+        return(UNKNOWN, "UNKNOWN - value out of range")
+    received_bps = rates['received_bps']
+    sent_bps = rates['sent_bps']
+
+    # Perfdata labels carry the description when several interfaces are checked
+    prefix = f"{descr}_" if len(args.descr) > 1 else ''
+    perfdata = (f"{prefix}received_bps={received_bps}, {prefix}sent_bps={sent_bps}, "
+                f"{prefix}received_bps_avg={rates['received_bps_avg']}, {prefix}sent_bps_avg={rates['sent_bps_avg']}")
+
+    if args.critical != 0 and received_bps > args.critical:
+        return(CRITICAL, f"CRITICAL - received_bps={received_bps} > {args.critical} | {perfdata}")
+
+    if args.warning != 0 and received_bps > args.warning:
+        return(WARNING, f"WARNING - received_bps={received_bps} > {args.warning} | {perfdata}")
+
+    # Traffic cliff: the rate fell by at least --cliff percent below its recent average
+    for direction in ('received', 'sent'):
+        if rate_engine.is_drop(rates[f"change_{direction}"], rates[f"baseline_{direction}_bps"], args.cliff, CLIFF_MINIMUM_BPS):
+            return(WARNING, f"WARNING - Interface {descr} (index {ifindex}) {direction}_bps={rates[f'{direction}_bps']} dropped {-rates[f'change_{direction}']:.0%} below average {int(rates[f'baseline_{direction}_bps'])} | {perfdata}")
+
+    # Normal output
+    return(OK, f"OK - Interface {descr} (index {ifindex}) is up. received_bps={received_bps}, sent_bps={sent_bps} | {perfdata}")
+
+def check_interfaces(args):
+    import sqlite3
+
+    try:
+        status = get_cached_status(args)
+        history = store_counters(args, status.values())
+    except (OSError, sqlite3.Error, snmp_client.SnmpError) as e:
+        return([(UNKNOWN, f"UNKNOWN - {e}")])
+
+    results = []
+    for descr in args.descr:
+        if descr not in status:
+            results.append((UNKNOWN, f"ERROR - Interface {descr} not found."))
+        else:
+            results.append(do_status(args, descr, status[descr], history[status[descr]['ifindex']]))
+
+    return(results)
+
+def print_results(results):
+    # Nagios takes the status from the first line and perfdata only from after the first '|',
+    # so the worst result goes first and the perfdata of every interface is printed once, there.
+    # The other results follow as long output. Returns the worst status.
+    results = sorted(results, key=lambda result: result[0], reverse=True)
+    texts = []
+    perfdata = []
+    for status_code, output in results:
+        text, sep, data = output.partition(' | ')
+        texts.append(text)
+        if data:
+            perfdata.append(data)
+
+    print(texts[0] + (f" | {', '.join(perfdata)}" if perfdata else ''))
+    for text in texts[1:]:
+        print(text)
+    return(results[0][0])
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Check interface status, returns sent and received bits per second as performance data', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-H', dest='hostname', required=True,
+                        help='host or IP address to query')
+    parser.add_argument('-C', dest='community', required=True,
+                        help='SNMP community name (2c)')
+    parser.add_argument('-d', dest='descr', required=True, action='append',
+                        help='interface description. May be repeated')
+    parser.add_argument('-f', dest='file', default='/tmp',
+                        help='directory of the counter database (default is /tmp/)')
+    parser.add_argument('-w', dest='warning', default=0, type=int,
+                        help='warning threshold (bps)')
+    parser.add_argument('-c', dest='critical', default=0, type=int,
+                        help='critical threshold (bps)')
+    parser.add_argument('-x', dest='cliff', default=90, type=int,
+                        help='warn when traffic drops this many percent below its recent average\n(default is 90, 0 disables)')
+    parser.add_argument('-p', dest='port', default=161, type=int,
+                        help='SNMP port (default is 161)')
+    parser.add_argument('-t', dest='timeout', default=2, type=float,
+                        help='SNMP timeout in seconds (default is 2)')
+    parser.add_argument('-v', dest='verbose', action='store_true',
+                        help='show verbose output')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    results = check_interfaces(args)
+
+    sys.exit(print_results(results))
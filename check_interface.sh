@@ -2,9 +2,9 @@
 # Name: check_interface.sh
 # Description: Nagios plugin to check interface status, returns sent and
 #              received bits per second as performance data
-# Requires: net-snmp, net-snmp-utils
+# Requires: net-snmp, net-snmp-utils, python3, counter_store.py
 # Author: John McNally, jmcnally@acm.org
-# Release date: 9/9/2024
+# Release date: 10/18/2026
 
 function do_status() {
   if [[ $hostname == '' ]] || [[ $community == '' ]] || [[ $descr == ''  ]]; then
@@ -71,39 +71,30 @@ function do_perf_data() {
   current_received=`snmpget -v 2c -On -c $community $hostname .1.3.6.1.2.1.31.1.1.1.6.$ifindex | cut -d ':' -f 2 | sed 's/ *//'`
   current_sent=`snmpget -v 2c -On -c $community $hostname .1.3.6.1.2.1.31.1.1.1.10.$ifindex | cut -d ':' -f 2 | sed 's/ *//'`
 
-  # Read previous values from tmp file
-  if [[ -e $file/check_interface_${hostname}_${ifindex} ]]; then
-    last_output=`/bin/cat $file/check_interface_${hostname}_${ifindex}`
-    last_date=`echo $last_output | cut -f2 -d":"`
-    last_sent=`echo $last_output | cut -f4 -d":"`
-    last_received=`echo $last_output | cut -f6 -d":"`
-  else
-    last_date=$current_date
-    last_sent=0
-    last_received=0
-  fi
-
-  # Determine values
-  elapsed=`expr $current_date - $last_date`
-  received=`expr $current_received - $last_received`
-  sent=`expr $current_sent - $last_sent`
-
-  received_bps=`echo "$received * 8 / $elapsed" | bc`
-  sent_bps=`echo "$sent * 8 / $elapsed" | bc`
-
-  # Write data file
-  echo "current_date:$current_date:sent:$current_sent:received:$current_received" > $file/check_interface_${hostname}_${ifindex}
+  # Store the sample and get the wrap-corrected deltas since the previous one (64-bit counters)
+  deltas=`$(dirname $0)/counter_store.py $file/counters.db $hostname interface_$ifindex $current_date $current_received $current_sent`
 
-  # Check for negative values (possible after a router reboot)
-  if [[ received -lt 0 ]] || [[ sent -lt 0 ]]; then
+  # Check for a counter reset (possible after a router reboot)
+  if [[ $deltas == 'reset' ]] || [[ $deltas == '' ]]; then
     echo "UNKNOWN - value out of range"
     exit $UNKNOWN
   fi
 
+  read elapsed received sent <<< "$deltas"
+
+  # Determine values
+  if [[ $elapsed -gt 0 ]]; then
+    received_bps=`echo "$received * 8 / $elapsed" | bc`
+    sent_bps=`echo "$sent * 8 / $elapsed" | bc`
+  else
+    received_bps=0
+    sent_bps=0
+  fi
+
   # Output verbose
   if [[ $verbose == true ]]; then
     echo "current_date=$current_date, current_sent=$current_sent, current_received=$current_received"
-    echo "last_date=$last_date, last_sent=$last_sent, last_received=$last_received"
+    echo "elapsed=$elapsed, sent=$sent, received=$received"
   fi
 }
 
@@ -116,7 +107,7 @@ Mandatory arguments:
   -d [descr]            interface description
 
 Optional arguments:
-  -f [file]             path to performance data temp file (default is /tmp/)
+  -f [file]             directory of the counter database (default is /tmp/)
   -w [warning]          warning threshold (bps)
   -c [critical]         critical threshold (bps)
   -v                    show verbose output
@@ -3,27 +3,76 @@
 # Description: Nagios plugin to check Monetra Payment Server health
 # Requires: Python 3.6 or later, python-argparse, python-requests
 # Author: John McNally, jmcnally@acm.org
-# Version: 1.1.0
-# Release date: 4/20/2023
+# Version: 1.3.3
+# Release date: 10/18/2026
 
-def perform_check(args):
-    from datetime import timedelta
-    import xml.etree.ElementTree as ET
+import sys, traceback
+import http_probe
+
+# Nagios Status Codes
+OK = 0
+WARNING = 1
+CRITICAL = 2
+UNKNOWN = 3
+
+# Resp fields used in the status output
+RESP_FIELDS = ('msoft_code', 'verbiage')
 
+def create_session(args):
     import requests
     from requests.packages.urllib3.exceptions import InsecureRequestWarning
     requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
-    # Nagios Status Codes
-    OK = 0
-    WARNING = 1
-    CRITICAL = 2
-    UNKNOWN = 3
+    # One session per Monetra server keeps the TLS connection alive between requests
+    session = requests.Session()
+    session.headers.update({'Content-Type': 'application/xml'})
+
+    return(session)
+
+def build_request(args, transactions):
+    import xml.etree.ElementTree as ET
+
+    # One <Trans> per (identifier, action) pair, all in a single envelope
+    root = ET.Element('MonetraTrans')
+    for identifier, action in transactions:
+        trans = ET.SubElement(root, 'Trans', identifier=str(identifier))
+        ET.SubElement(trans, 'action').text = action
+        ET.SubElement(trans, 'username').text = "MADMIN:{0}".format(args.user)
+        ET.SubElement(trans, 'password').text = args.password
+
+    return(b"<?xml version=\"1.0\" ?>\n" + ET.tostring(root))
+
+def parse_response(chunks):
+    import xml.etree.ElementTree as ET
+
+    code = ''
+    responses = {}
+
+    # The body is fed to the parser chunk by chunk as bytes, so it is never decoded to one
+    # string (r.text), and the tree is built in C. Only the fields the check reports are
+    # copied out of each Resp.
+    parser = ET.XMLParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    root = parser.close()
+
+    for status in root.iterfind('DataTransferStatus'):
+        code = status.get('code')
+    for response in root.iterfind('Resp'):
+        responses[response.get('identifier')] = {field: response.findtext(field) for field in RESP_FIELDS}
+
+    return(code, responses)
+
+def perform_check(args):
+    status_code, output = run_check(args, create_session(args))
+    print(output)
+    sys.exit(status_code)
+
+def run_check(args, session):
+    from datetime import timedelta
 
     # Variables
     host = args.host
-    user = args.user
-    password = args.password
     timeout = args.timeout
     warn = args.warn
     critical = args.critical
@@ -31,95 +80,184 @@ def perform_check(args):
     msoft_code = ''
     verbiage = ''
     rt_output = ''
+    elapsed = timedelta()
+    latency = {}
+    responses = {}
+    probe_samples = {'connect': [], 'tls': [], 'ttfb': [], 'total': []}
+    transactions = list(enumerate(args.action, 1))
 
     url = "https://{0}:8666".format(host)
 
-    xml_in  = "<?xml version=\"1.0\" ?>\n \
-    <MonetraTrans>\n \
-    \t<Trans identifier=\"1\">\n \
-    \t\t<action>chkpwd</action>\n \
-    \t\t<username>MADMIN:{0}</username>\n \
-    \t\t<password>{1}</password>\n \
-    \t</Trans>\n \
-    </MonetraTrans>\n".format(user,password)
-
-    if args.verbose:
-        print (xml_in)
+    # Pipeline all transactions in one envelope, or send one envelope per transaction
+    if args.pipeline:
+        batches = [transactions]
+    else:
+        batches = [[transaction] for transaction in transactions]
 
-    # Post the request
+    # Post the requests
     try:
-        r = requests.post(url=url,
-                          data=xml_in,
-                          verify=False,
-                          timeout=timeout,
-                          headers={'Content-Type': 'application/xml'})
+        for batch in batches:
+            xml_in = build_request(args, batch)
+            if args.verbose:
+                print (xml_in.decode())
+
+            if args.probes > 1:
+                # Thresholds apply to the chosen percentile of the probes' total time
+                samples, status, content = http_probe.probe("{0}:8666".format(host), 'POST', '/',
+                                                            body=xml_in,
+                                                            headers={'Content-Type': 'application/xml'},
+                                                            count=args.probes,
+                                                            timeout=timeout)
+                if status != 200:
+                    raise ValueError("Monetra returned HTTP {0}".format(status))
+                for timing in probe_samples:
+                    probe_samples[timing].extend(samples[timing])
+                batch_elapsed = timedelta(seconds=http_probe.percentile(samples['total'], args.percentile))
+                if args.verbose:
+                    print (content.decode())
+                chunks = [content]
+            else:
+                r = session.post(url=url,
+                                 data=xml_in,
+                                 verify=False,
+                                 timeout=timeout,
+                                 stream=True)
+                batch_elapsed = r.elapsed
+                if args.verbose:
+                    print (r.text)
+                chunks = r.iter_content(chunk_size=65536)
+
+            elapsed += batch_elapsed
+            for identifier, action in batch:
+                latency[identifier] = batch_elapsed.total_seconds()
+
+            # Parse the response body as XML
+            batch_code, batch_responses = parse_response(chunks)
+            if code in ('', 'SUCCESS'):
+                code = batch_code
+            responses.update(batch_responses)
     except:
         exc_type, exc_value, exc_traceback = sys.exc_info()
         if args.verbose:
             lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
             print (''.join('!! ' + line for line in lines))
-        else:
-            print ("MONETRA CRITICAL - {0}".format(exc_value))
-        sys.exit(CRITICAL)
+        return(CRITICAL, "MONETRA CRITICAL - {0}".format(exc_value))
 
     # Format the response elapsed time
     if warn != 0 or critical != 0:
-        rt_output = "in {0:.3f} seconds response time".format(float(r.elapsed.seconds) + float(r.elapsed.microseconds) / 1000000)
+        rt_output = "in {0:.3f} seconds response time".format(elapsed.total_seconds())
+        if args.probes > 1:
+            rt_output = "in {0:.3f} seconds {1} response time over {2} probes".format(elapsed.total_seconds(), args.percentile, args.probes)
         if args.verbose:
             print ("Request completed {0}".format(rt_output))
 
-    # Parse the response text as XML
-    xml_out = r.text
-    if args.verbose:
-        print (xml_out)
-
-    root = ET.fromstring(xml_out)
+    # Per-transaction latency as performance data
+    perfdata = []
+    for identifier, action in transactions:
+        label = action if args.action.count(action) == 1 else "{0}_{1}".format(action, identifier)
+        thresholds = ";{0};{1}".format(warn or '', critical or '') if warn != 0 or critical != 0 else ''
+        perfdata.append("{0}={1:.3f}s{2}".format(label, latency[identifier], thresholds))
+    if args.probes > 1:
+        perfdata.append(http_probe.perfdata(http_probe.summarize(probe_samples)))
+    perfdata = ' '.join(perfdata)
 
-    for status in root.findall('DataTransferStatus'):
-        code = status.get('code')
-    for response in root.findall('Resp'):
-        msoft_code = response.find('msoft_code').text
-    for response in root.findall('Resp'):
-        verbiage = response.find('verbiage').text
+    # Report the first failed transaction, or the first transaction if all succeeded
+    failed = [t for t in transactions if responses.get(str(t[0]), {}).get('msoft_code') != 'INT_SUCCESS']
+    identifier, action = failed[0] if failed else transactions[0]
+    response = responses.get(str(identifier), {})
+    msoft_code = response.get('msoft_code', '')
+    verbiage = response.get('verbiage', '')
+    if failed and len(transactions) > 1:
+        verbiage = "{0}: {1}".format(action, verbiage)
 
     # Return the Nagios status code and summary
     if code == 'SUCCESS':
         if msoft_code == 'INT_SUCCESS':
             if warn == 0 and critical == 0:
-                print ("MONETRA OK - {0}".format(verbiage))
-                sys.exit(OK)
-            elif r.elapsed <= timedelta(seconds=warn):
-                print ("MONETRA OK - {0} {1}".format(verbiage, rt_output))
-                sys.exit(OK)
-            elif r.elapsed <= timedelta(seconds=critical):
-                print ("MONETRA WARNING - {0} {1} {2} (> {3} seconds)".format(code, verbiage, rt_output, warn))
-                sys.exit(WARNING)
-       	    elif r.elapsed > timedelta(seconds=critical):
-                print ("MONETRA CRITICAL - {0} {1} {2} (> {3} seconds)".format(code, verbiage, rt_output, critical))
-                sys.exit(CRITICAL)
+                return(OK, "MONETRA OK - {0} | {1}".format(verbiage, perfdata))
+            elif elapsed <= timedelta(seconds=warn):
+                return(OK, "MONETRA OK - {0} {1} | {2}".format(verbiage, rt_output, perfdata))
+            elif elapsed <= timedelta(seconds=critical):
+                return(WARNING, "MONETRA WARNING - {0} {1} {2} (> {3} seconds) | {4}".format(code, verbiage, rt_output, warn, perfdata))
+            else:
+                return(CRITICAL, "MONETRA CRITICAL - {0} {1} {2} (> {3} seconds) | {4}".format(code, verbiage, rt_output, critical, perfdata))
         else:
-            print ("MONETRA WARNING - {0} {1} {2}".format(code, msoft_code, verbiage))
-            sys.exit(WARNING)
+            return(WARNING, "MONETRA WARNING - {0} {1} {2} | {3}".format(code, msoft_code, verbiage, perfdata))
     else:
-        print ("MONETRA CRITICAL - {0} {1} {2}".format(code, msoft_code, verbiage))
-        sys.exit(CRITICAL)
+        return(CRITICAL, "MONETRA CRITICAL - {0} {1} {2} | {3}".format(code, msoft_code, verbiage, perfdata))
+
+def run_daemon(args):
+    import argparse, time
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Keep one session open per server and submit passive results every interval
+    targets = []
+    for host in args.host:
+        target = argparse.Namespace(**vars(args))
+        target.host = host
+        targets.append((target, create_session(target)))
+
+    # Check the servers concurrently, at most --parallel at a time, so one slow server
+    # does not delay the results of the others
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        while True:
+            started = time.time()
+            statuses = executor.map(lambda target_session: run_check(*target_session), targets)
+            results = [(target, status) for (target, session), status in zip(targets, statuses)]
+            if args.verbose:
+                for target, (status_code, output) in results:
+                    print (output)
+            submit_results(args, results)
+            time.sleep(max(0, args.interval - (time.time() - started)))
+
+def submit_results(args, results):
+    import time
+
+    commands = ''
+    for target, (status_code, output) in results:
+        commands += "[{0}] PROCESS_SERVICE_CHECK_RESULT;{1};{2};{3};{4}\n".format(int(time.time()), target.host, args.service, status_code, output)
+
+    # Write one passive check result per server to the Nagios external command file
+    try:
+        with open(args.command_file, 'w') as command_file:
+            command_file.write(commands)
+    except OSError as e:
+        print ("ERROR: Unable to write to {0}: {1}".format(args.command_file, e), file=sys.stderr)
 
 def define_parser():
     import argparse
     parser = argparse.ArgumentParser(description='Check Monetra Payment Server health', formatter_class=argparse.RawTextHelpFormatter)
 
-    parser.add_argument('-H', '--host', required=True,
-                        help='hostname or IP address of server')
+    parser.add_argument('-H', '--host', required=True, action='append',
+                        help='hostname or IP address of server. May be repeated in daemon mode')
     parser.add_argument('-u', '--user', required=True,
                         help='username for authentication to server\nNOTE: Use a low-privilege admin account for this purpose')
     parser.add_argument('-p', '--password', required=True,
                         help='password for authentication to server')
-    parser.add_argument('-t', '--timeout', default=10,
+    parser.add_argument('-a', '--action', action='append',
+                        help='admin transaction to run. May be repeated. Default is chkpwd')
+    parser.add_argument('-P', '--pipeline', action='store_true',
+                        help='send all transactions in one envelope\nNOTE: Transactions then share the envelope response time')
+    parser.add_argument('-n', '--probes', default=1, type=int,
+                        help='number of times each envelope is sent over one connection to measure latency\nDefault is 1')
+    parser.add_argument('--percentile', default='p95', choices=http_probe.PERCENTILES,
+                        help='percentile of the probes compared with --warn and --critical. Default is p95')
+    parser.add_argument('-t', '--timeout', default=10, type=float,
                         help='connection timeout. Default is 10 seconds')
     parser.add_argument('-w', '--warn', default=0, type=float,
                         help='warning threshold for request duration in seconds')
     parser.add_argument('-c', '--critical', default=0, type=float,
                         help='critical threshold for request duration in seconds')
+    parser.add_argument('-D', '--daemon', action='store_true',
+                        help='run continuously and submit passive check results to Nagios')
+    parser.add_argument('-i', '--interval', default=60, type=float,
+                        help='seconds between checks in daemon mode. Default is 60 seconds')
+    parser.add_argument('--parallel', default=8, type=int,
+                        help='maximum number of servers checked concurrently in daemon mode. Default is 8')
+    parser.add_argument('--command-file', default='/var/spool/nagios/cmd/nagios.cmd',
+                        help='Nagios external command file for passive check results\nDefault is /var/spool/nagios/cmd/nagios.cmd')
+    parser.add_argument('--service', default='Monetra',
+                        help='description of the passive service in Nagios. Default is "Monetra"')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='increase output verbosity')
     parser.set_defaults(func=perform_check)
@@ -127,12 +265,26 @@ def define_parser():
     return(parser)
 
 # MAIN()
-import sys, traceback
+if __name__ == '__main__':
+    import argparse
 
-parser = define_parser()
-args = parser.parse_args()
+    parser = define_parser()
+    args = parser.parse_args()
 
-if args.verbose:
-    print (args)
+    if args.verbose:
+        print (args)
+
+    if not args.action:
+        args.action = ['chkpwd']
 
-args.func(args)
+    if args.daemon:
+        args.func = run_daemon
+    elif len(args.host) > 1:
+        parser.error('more than one -H/--host requires -D/--daemon')
+    else:
+        args.host = args.host[0]
+
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        sys.exit(OK)
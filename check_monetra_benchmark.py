@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+# Name: check_monetra_benchmark.py
+# Description: Benchmark of check_monetra.parse_response() against the earlier parsers, on
+#              synthetic Monetra responses of 1 to 10000 Resp elements
+#              text:   r.text decoded, ET.fromstring(), every field of every Resp (version 1.3.0)
+#              pull:   XMLPullParser over the chunks, every Resp cleared after use (version 1.3.1)
+#              current parse_response()
+# Requires: Python 3.6 or later, python-requests, check_monetra.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.0
+# Release date: 10/18/2026
+
+import gc, time, tracemalloc
+import check_monetra
+
+CHUNK_SIZE = 65536
+
+def build_response(count, fields=13):
+    extra = ''.join(f"<field{i}>value {i} of the response</field{i}>" for i in range(fields))
+    resps = ''.join(f"<Resp identifier=\"{i}\"><code>AUTH</code><msoft_code>INT_SUCCESS</msoft_code>"
+                    f"<verbiage>Transaction approved</verbiage>{extra}</Resp>" for i in range(count))
+    return(f"<?xml version=\"1.0\" ?>\n<MonetraResp><DataTransferStatus code=\"SUCCESS\"/>{resps}</MonetraResp>".encode())
+
+def parse_text(body):
+    import requests
+    import xml.etree.ElementTree as ET
+
+    r = requests.models.Response()
+    r._content = body
+    r.encoding = 'utf-8'
+
+    code = ''
+    root = ET.fromstring(r.text)
+    for status in root.findall('DataTransferStatus'):
+        code = status.get('code')
+    return(code, {response.get('identifier'): {field.tag: field.text for field in response} for response in root.findall('Resp')})
+
+def parse_pull(chunks):
+    import xml.etree.ElementTree as ET
+
+    code = ''
+    responses = {}
+    parser = ET.XMLPullParser(events=('end',))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if element.tag == 'Resp':
+                responses[element.get('identifier')] = {field.tag: field.text for field in element}
+                element.clear()
+            elif element.tag == 'DataTransferStatus':
+                code = element.get('code')
+    parser.close()
+    return(code, responses)
+
+def measure(function, argument, repeat):
+    # Best time of `repeat` runs without garbage collection, then the peak memory of one run
+    gc.disable()
+    best = None
+    for i in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    gc.enable()
+
+    tracemalloc.start()
+    function(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return(best, peak)
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark check_monetra.parse_response()', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-r', '--repeat', default=15, type=int,
+                        help='runs per measurement, the best is reported. Default is 15')
+    parser.add_argument('-s', '--sizes', default='1,3,100,1000,10000',
+                        help='comma-separated Resp counts. Default is 1,3,100,1000,10000')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    print(f"{'Resp':>6}  {'text':>20}  {'pull':>20}  {'current':>20}")
+    for count in [int(size) for size in args.sizes.split(',')]:
+        body = build_response(count)
+        chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+        # Every parser must report the same status and fields
+        code, responses = check_monetra.parse_response(chunks)
+        expected = parse_text(body)
+        assert code == expected[0]
+        assert all(responses[identifier][field] == fields[field] for identifier, fields in expected[1].items() for field in check_monetra.RESP_FIELDS)
+
+        columns = []
+        for function, argument in ((parse_text, body), (parse_pull, chunks), (check_monetra.parse_response, chunks)):
+            best, peak = measure(function, argument, args.repeat)
+            columns.append(f"{best * 1000:9.3f} ms {peak / 1024:6.0f} KiB")
+        print(f"{count:>6}  " + '  '.join(columns))
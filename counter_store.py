@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# Name: counter_store.py
+# Description: Shared SNMP counter state for the interface and BGP checks, keyed by (host, object)
+#              One SQLite file in WAL mode replaces the per-check text files in the temp directory
+#              Also usable from the shell checks: counter_store.py DB HOST OBJECT TIMESTAMP IN OUT
+# Requires: Python 3.6 or later
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.1
+# Release date: 10/18/2026
+
+import contextlib
+
+DB_FILE = 'counters.db'
+
+# Samples kept per object in the history ring buffer
+HISTORY_SLOTS = 12
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS counters (
+    host TEXT NOT NULL,
+    object TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    value_in INTEGER NOT NULL,
+    value_out INTEGER NOT NULL,
+    PRIMARY KEY (host, object)
+) WITHOUT ROWID'''
+
+# Fixed-slot ring buffer; sample number n of an object is kept in slot n % HISTORY_SLOTS
+HISTORY_SCHEMA = '''CREATE TABLE IF NOT EXISTS history (
+    host TEXT NOT NULL,
+    object TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    sequence INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    value_in INTEGER NOT NULL,
+    value_out INTEGER NOT NULL,
+    PRIMARY KEY (host, object, slot)
+) WITHOUT ROWID'''
+
+def to_signed(value):
+    # SQLite integers are signed 64-bit, Counter64 values are not
+    return(value - 2**64 if value >= 2**63 else value)
+
+def to_unsigned(value):
+    return(value + 2**64 if value < 0 else value)
+
+def connect(path):
+    import sqlite3
+
+    # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(SCHEMA)
+    conn.execute(HISTORY_SCHEMA)
+
+    return(conn)
+
+@contextlib.contextmanager
+def transaction(path):
+    # One write transaction, so overlapping checks cannot lose an update
+    conn = connect(path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def read_previous(conn, host, samples):
+    previous = {obj: None for obj in samples}
+    for obj, timestamp, value_in, value_out in conn.execute('SELECT object, timestamp, value_in, value_out FROM counters WHERE host = ?', (host,)):
+        if obj in previous:
+            previous[obj] = (timestamp, to_unsigned(value_in), to_unsigned(value_out))
+    return(previous)
+
+def write_samples(conn, host, samples):
+    conn.executemany('INSERT OR REPLACE INTO counters VALUES (?, ?, ?, ?, ?)',
+                     [(host, obj, timestamp, to_signed(value_in), to_signed(value_out))
+                      for obj, (timestamp, value_in, value_out) in samples.items()])
+
+def update(path, host, samples):
+    # Store {object: (timestamp, value_in, value_out)} and return the previous sample of every
+    # object (None if there was none)
+    with transaction(path) as conn:
+        previous = read_previous(conn, host, samples)
+        write_samples(conn, host, samples)
+
+    return(previous)
+
+def update_history(path, host, samples, slots=HISTORY_SLOTS):
+    # Like update(), but also keep the last `slots` samples of every object and return
+    # {object: [samples, oldest first]} without the new sample
+    with transaction(path) as conn:
+        previous = read_previous(conn, host, samples)
+        history = {obj: [] for obj in samples}
+        for obj, sequence, timestamp, value_in, value_out in conn.execute('SELECT object, sequence, timestamp, value_in, value_out FROM history WHERE host = ? AND slot < ? ORDER BY object, sequence', (host, slots)):
+            if obj in history:
+                history[obj].append((sequence, (timestamp, to_unsigned(value_in), to_unsigned(value_out))))
+
+        rows = []
+        for obj, (timestamp, value_in, value_out) in samples.items():
+            sequence = history[obj][-1][0] + 1 if history[obj] else 0
+            history[obj] = [sample for _, sample in history[obj]]
+            # A newer sample written by update() (for example by the shell checks) goes last
+            if previous[obj] is not None and (not history[obj] or previous[obj][0] > history[obj][-1][0]):
+                history[obj].append(previous[obj])
+            # A second sample in the same second would push a real one out of the ring
+            if history[obj] and timestamp <= history[obj][-1][0]:
+                continue
+            rows.append((host, obj, sequence % slots, sequence, timestamp, to_signed(value_in), to_signed(value_out)))
+
+        conn.executemany('INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        write_samples(conn, host, samples)
+
+    return(history)
+
+def delta(previous, current, bits=64):
+    if current >= previous:
+        return(current - previous)
+
+    # A counter that went backwards either wrapped or was reset (reboot, clear counters).
+    # Treat it as a wrap only if it was in the top quarter of its range and is now in the
+    # bottom quarter; anything else (3e9 to 1e6 on a 32-bit counter) is a reset.
+    quarter = 2**(bits - 2)
+    if previous >= 2**bits - quarter and current < quarter:
+        return(2**bits - previous + current)
+    return(None)
+
+def deltas(previous, current, bits=64):
+    # Return (elapsed, delta_in, delta_out) between two samples, (0, 0, 0) for the first sample,
+    # or None if a counter was reset
+    if previous is None:
+        return(0, 0, 0)
+
+    delta_in = delta(previous[1], current[1], bits)
+    delta_out = delta(previous[2], current[2], bits)
+    if delta_in is None or delta_out is None:
+        return(None)
+
+    return(current[0] - previous[0], delta_in, delta_out)
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Store a counter sample and print "elapsed delta_in delta_out" since the previous one,\nor "reset" if a counter was reset', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('database', help='path to the counter database')
+    parser.add_argument('host', help='host name')
+    parser.add_argument('object', help='object name, for example interface_<ifindex>')
+    parser.add_argument('timestamp', type=int, help='sample time (seconds since the epoch)')
+    parser.add_argument('value_in', type=int, help='current in/received counter')
+    parser.add_argument('value_out', type=int, help='current out/sent counter')
+    parser.add_argument('-b', dest='bits', default=64, type=int, choices=[32, 64],
+                        help='counter size in bits (default is 64)')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    current = (args.timestamp, args.value_in, args.value_out)
+    previous = update(args.database, args.host, {args.object: current})[args.object]
+    result = deltas(previous, current, args.bits)
+
+    print('reset' if result is None else '%d %d %d' % result)
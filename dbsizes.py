@@ -1,40 +1,508 @@
 #!/usr/bin/python3
-# Display mysql database sizes with total
+# Display mysql database sizes with total, for one or more servers queried concurrently
+# Output is a table with per-server and grand totals, JSON, or a Nagios status line with perfdata
+# Sizes come from the cached InnoDB statistics, the datadir files or the full information_schema query
+# Optionally keeps a size history for growth rates, days until full and a per-table drill-down
 # Requirements: python 3.6 or later, python3-mysqlclient, mysql connection info in local file '.my.cnf'
 # Author: John McNally, jmcnally@acm.org, 9/26/2023
+# Version: 2.2.2, 10/18/2026
+#
+# Config file example, one section per server (the default section is [mysql]):
+#   [mysql]
+#   user = monitor
+#   password = 'secret'
+#   host = db1.example.com
+#
+#   [db2]
+#   user = monitor
+#   password = 'secret'
+#   host = db2.example.com
+#   port = 3307
+#   # datadir of this server as mounted here, for the files method; without it the files
+#   # method only runs on the server's own host
+#   datadir = /mnt/db2/mysql
 
-import configparser
-import MySQLdb
-import os
 import sys
 
-DBSIZES_SQL = 'SELECT table_schema AS name, ROUND(SUM(data_length + index_length) / 1024 / 1024, 0) AS size FROM information_schema.tables GROUP BY table_schema'
-total = 0
+# Nagios Status Codes
+OK = 0
+WARNING = 1
+CRITICAL = 2
+UNKNOWN = 3
+
+# The full query makes the server open every table (and with innodb_stats_on_metadata=ON
+# recalculate its statistics), which is slow and holds metadata locks on huge schemas
+DBSIZES_SQL = 'SELECT table_schema AS name, SUM(data_length) AS data, SUM(index_length) AS indexes FROM information_schema.tables GROUP BY table_schema'
+TABLES_SQL = 'SELECT table_name AS name, data_length AS data, index_length AS indexes FROM information_schema.tables WHERE table_schema = %s'
+
+# Persistent InnoDB statistics are read as they are, in pages. Only InnoDB tables are counted.
+# Partitions (table#p#partition) are added up per table.
+STATS_SQL = 'SELECT database_name AS name, SUM(clustered_index_size) * @@innodb_page_size AS data, SUM(sum_of_other_index_sizes) * @@innodb_page_size AS indexes FROM mysql.innodb_table_stats GROUP BY database_name'
+STATS_TABLES_SQL = "SELECT SUBSTRING_INDEX(table_name, '#', 1) AS name, SUM(clustered_index_size) * @@innodb_page_size AS data, SUM(sum_of_other_index_sizes) * @@innodb_page_size AS indexes FROM mysql.innodb_table_stats WHERE database_name = %s GROUP BY name"
+
+DATADIR_SQL = 'SELECT @@datadir AS datadir, @@hostname AS hostname'
+
+# Size history for --growth, one row per schema (table_name '') or table per run
+STORE_SCHEMA = '''CREATE TABLE IF NOT EXISTS sizes (
+    server TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data INTEGER NOT NULL,
+    indexes INTEGER NOT NULL,
+    PRIMARY KEY (server, schema_name, table_name, timestamp)
+) WITHOUT ROWID'''
+
+# Samples older than this are removed from the store
+STORE_RETENTION_DAYS = 400
+
+# Tables listed per schema in the --top drill-down
+TOP_TABLES = 10
+
+def read_option(config_object, section, option, fallback=None):
+    value = config_object.get(section, option, fallback=fallback)
+    return(value.strip("'\"") if value else value)
+
+def load_servers(args):
+    import configparser
 
-try:
     # Read MySQL connection info from file '.my.cnf'
-    config_object = configparser.ConfigParser()
-    with open(".my.cnf","r") as file_object:
+    config_object = configparser.ConfigParser(allow_no_value=True, interpolation=None)
+    with open(args.config, "r") as file_object:
         config_object.read_file(file_object)
-        user = config_object.get("mysql","user")
-        host = config_object.get("mysql","host")
-        password = config_object.get("mysql","password")
-        password = password.replace("'", "")
-
-    # Connect to the database and execute the SQL query
-    connection = MySQLdb.connect(host=host,user=user,password=password)
-    cursor = connection.cursor(MySQLdb.cursors.DictCursor)
-    cursor.execute(DBSIZES_SQL)
-    dbsizes = cursor.fetchall()
-
-    # Print the formatted output
-    print("Size (MB) Name")
-    for db in dbsizes:
-        print(f"{db['size']:>8,}  {db['name']}")
-        total += db['size']
-    print("-----------------------------")
-    print(f"{total:>8,}  TOTAL")
-except Exception as e:
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-    print(f"ERROR: {e}, type: {exc_type}, file: {fname}, line: {exc_tb.tb_lineno}")
+
+    if args.all:
+        sections = [section for section in config_object.sections() if config_object.has_option(section, 'host')]
+    else:
+        sections = args.section or ['mysql']
+
+    servers = []
+    for section in sections:
+        if not config_object.has_section(section):
+            raise configparser.NoSectionError(section)
+        servers.append({'name': section,
+                        'host': read_option(config_object, section, 'host', 'localhost'),
+                        'port': int(read_option(config_object, section, 'port', '3306')),
+                        'user': read_option(config_object, section, 'user'),
+                        'password': read_option(config_object, section, 'password', ''),
+                        'datadir': read_option(config_object, section, 'datadir')})
+
+    # Hosts given on the command line use the credentials of the first section
+    if args.host:
+        credentials = servers[0]
+        servers = []
+        for host in args.host:
+            hostname, _, port = host.partition(':')
+            servers.append(dict(credentials, name=host, host=hostname, port=int(port or credentials['port']), datadir=None))
+
+    return(servers)
+
+def query_sizes(args, cursor, sql, params=None):
+    cursor.execute(sql, params)
+
+    # (name, data bytes, index bytes); schemas without tables have no size
+    return([(db['name'], int(db['data'] or 0), int(db['indexes'] or 0)) for db in cursor.fetchall()])
+
+# Every method returns the sizes of all schemas, or of the tables of one schema
+def full_sizes(args, server, cursor, schema=None):
+    if schema is None:
+        return(query_sizes(args, cursor, DBSIZES_SQL))
+    return(query_sizes(args, cursor, TABLES_SQL, (schema,)))
+
+def stats_sizes(args, server, cursor, schema=None):
+    if schema is None:
+        return(query_sizes(args, cursor, STATS_SQL))
+    return(query_sizes(args, cursor, STATS_TABLES_SQL, (schema,)))
+
+def decode_filename(name):
+    # Schema directories use the MySQL file name encoding, @xxxx for special characters
+    import re
+    return(re.sub(r'@([0-9a-f]{4})', lambda match: chr(int(match.group(1), 16)), name))
+
+def file_sizes(args, server, cursor, schema=None):
+    import os, socket
+
+    # Sum the files in each schema directory of the datadir, which must be readable from here.
+    # Shared tablespaces (ibdata1, undo, redo logs) are not part of any schema.
+    # @@datadir is a path on the server, so it is only used when the server runs on this host;
+    # for any other server the datadir must be set in its config section
+    if server['datadir']:
+        datadir = server['datadir']
+    else:
+        cursor.execute(DATADIR_SQL)
+        row = cursor.fetchone()
+        if row['hostname'] != socket.gethostname():
+            raise ValueError(f"{server['name']} runs on {row['hostname']}, not this host; set datadir in its config section")
+        datadir = row['datadir']
+
+    dbsizes = []
+    with os.scandir(datadir) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if not entry.is_dir(follow_symlinks=False) or entry.name.startswith(('#', '.')):
+                continue
+            if schema is None:
+                size = 0
+                for root, dirs, files in os.walk(entry.path):
+                    size += sum(os.lstat(os.path.join(root, name)).st_size for name in files)
+                dbsizes.append((decode_filename(entry.name), size, 0))
+            elif decode_filename(entry.name) == schema:
+                # Table files are table.ibd, table#p#partition.ibd or MyISAM table.MYD/.MYI
+                tables = {}
+                for table_file in os.scandir(entry.path):
+                    name = decode_filename(table_file.name.split('.')[0].split('#')[0])
+                    data, indexes = tables.get(name, (0, 0))
+                    size = table_file.stat(follow_symlinks=False).st_size
+                    tables[name] = (data, indexes + size) if table_file.name.endswith('.MYI') else (data + size, indexes)
+                dbsizes = [(name, data, indexes) for name, (data, indexes) in sorted(tables.items())]
+
+    return(dbsizes)
+
+SIZE_METHODS = {'stats': stats_sizes, 'files': file_sizes, 'full': full_sizes}
+
+def get_sizes(args, server):
+    import time
+    import MySQLdb, MySQLdb.cursors
+
+    # Connect to the database and get the sizes with the selected method
+    connection = MySQLdb.connect(host=server['host'], port=server['port'], user=server['user'],
+                                 password=server['password'], connect_timeout=args.timeout)
+    try:
+        cursor = connection.cursor(MySQLdb.cursors.DictCursor)
+        start = time.monotonic()
+        method = args.method
+        try:
+            dbsizes = SIZE_METHODS[method](args, server, cursor)
+        except (OSError, ValueError, MySQLdb.Error):
+            if not args.fallback or method == 'full':
+                raise
+            dbsizes = []
+        # No statistics (innodb_stats_persistent=OFF) or no readable datadir
+        if not dbsizes and args.fallback and method != 'full':
+            method = 'full'
+            dbsizes = full_sizes(args, server, cursor)
+        elapsed = round(time.monotonic() - start, 3)
+    finally:
+        connection.close()
+
+    return(dbsizes, method, elapsed)
+
+def collect(args, servers):
+    import MySQLdb
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Query the servers concurrently, with at most --parallel connections open at a time
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        futures = [executor.submit(get_sizes, args, server) for server in servers]
+        results = []
+        for server, future in zip(servers, futures):
+            result = {'server': server['name'], 'host': server['host'], 'method': args.method,
+                      'elapsed': None, 'schemas': [], 'databases': [], 'total': 0, 'error': None}
+            try:
+                result['schemas'], result['method'], result['elapsed'] = future.result()
+                result['databases'] = [(name, round((data + indexes) / 1024 / 1024)) for name, data, indexes in result['schemas']]
+                result['total'] = sum(size for name, size in result['databases'])
+            except (OSError, ValueError, MySQLdb.Error) as e:
+                result['error'] = str(e)
+            results.append(result)
+
+    return(results)
+
+def growth_rate(samples):
+    # Least-squares slope of [(timestamp, bytes)] in bytes per day, None without two distinct samples
+    if len(samples) < 2:
+        return(None)
+    mean_time = sum(timestamp for timestamp, size in samples) / len(samples)
+    mean_size = sum(size for timestamp, size in samples) / len(samples)
+    variance = sum((timestamp - mean_time) ** 2 for timestamp, size in samples)
+    if variance == 0:
+        return(None)
+    return(sum((timestamp - mean_time) * (size - mean_size) for timestamp, size in samples) / variance * 86400)
+
+def is_trusted(st):
+    import os
+
+    # Owned by this user and not writable by group or others
+    return(st.st_uid == os.geteuid() and not st.st_mode & 0o022)
+
+def open_store(args):
+    import os, sqlite3, stat
+
+    # Refuse a store someone else could have planted or replaced
+    store_dir = os.path.dirname(os.path.abspath(args.store))
+    os.makedirs(store_dir, mode=0o700, exist_ok=True)
+    if not is_trusted(os.lstat(store_dir)):
+        raise PermissionError(f"store directory {store_dir} must belong to this user and not be writable by others")
+    try:
+        st = os.lstat(args.store)
+    except FileNotFoundError:
+        pass
+    else:
+        if not stat.S_ISREG(st.st_mode) or not is_trusted(st):
+            raise PermissionError(f"store {args.store} must be a regular file that belongs to this user")
+
+    conn = sqlite3.connect(args.store, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(STORE_SCHEMA)
+    return(conn)
+
+def store_sizes(conn, server, timestamp, rows):
+    # rows are (schema, table, data, indexes); schema totals have an empty table name
+    conn.executemany('INSERT OR REPLACE INTO sizes VALUES (?, ?, ?, ?, ?, ?)',
+                     [(server, schema, table, timestamp, data, indexes) for schema, table, data, indexes in rows])
+
+def read_growth(args, conn, server, schema=None):
+    # {schema: bytes per day} over the last --days, or {table: bytes per day} of one schema
+    import time
+
+    since = int(time.time()) - args.days * 86400
+    if schema is None:
+        rows = conn.execute("SELECT schema_name, timestamp, data + indexes FROM sizes WHERE server = ? AND table_name = '' AND timestamp >= ? ORDER BY timestamp",
+                            (server, since))
+    else:
+        rows = conn.execute("SELECT table_name, timestamp, data + indexes FROM sizes WHERE server = ? AND schema_name = ? AND table_name != '' AND timestamp >= ? ORDER BY timestamp",
+                            (server, schema, since))
+
+    samples = {}
+    for name, timestamp, size in rows:
+        samples.setdefault(name, []).append((timestamp, size))
+    return({name: growth_rate(history) for name, history in samples.items()})
+
+def days_until_full(args, total, growth):
+    # Projection against --capacity (MB) at the current growth rate
+    if not args.capacity or not growth or growth <= 0:
+        return(None)
+    return(max(0, (args.capacity - total) * 1024 * 1024 / growth))
+
+def track_growth(args, results):
+    import time
+
+    # Store this run and add the growth of every schema and server to the results
+    timestamp = int(time.time())
+    conn = open_store(args)
+    with conn:
+        conn.execute('DELETE FROM sizes WHERE timestamp < ?', (timestamp - STORE_RETENTION_DAYS * 86400,))
+        for result in results:
+            if not result['error']:
+                store_sizes(conn, result['server'], timestamp,
+                            [(name, '', data, indexes) for name, data, indexes in result['schemas']])
+
+    for result in results:
+        if result['error']:
+            continue
+        growth = read_growth(args, conn, result['server'])
+        result['growth'] = {name: growth.get(name) for name, data, indexes in result['schemas']}
+        rates = [rate for rate in result['growth'].values() if rate is not None]
+        result['growth_total'] = sum(rates) if rates else None
+        result['days_until_full'] = days_until_full(args, result['total'], result['growth_total'])
+
+    return(conn, timestamp)
+
+def get_tables(args, server, method, schemas):
+    import MySQLdb, MySQLdb.cursors
+
+    # Per-table sizes of a few schemas only, with the method that produced the schema sizes
+    connection = MySQLdb.connect(host=server['host'], port=server['port'], user=server['user'],
+                                 password=server['password'], connect_timeout=args.timeout)
+    try:
+        cursor = connection.cursor(MySQLdb.cursors.DictCursor)
+        tables = {schema: SIZE_METHODS[method](args, server, cursor, schema) for schema in schemas}
+    finally:
+        connection.close()
+
+    return(tables)
+
+def drill_down(args, servers, results, conn, timestamp):
+    import MySQLdb
+    from concurrent.futures import ThreadPoolExecutor
+
+    # The --top fastest-growing schemas of every server get the per-table query
+    todo = []
+    for server, result in zip(servers, results):
+        growing = sorted((rate, name) for name, rate in result.get('growth', {}).items() if rate is not None and rate > 0)
+        schemas = [name for rate, name in reversed(growing[-args.top:])]
+        if schemas:
+            todo.append((server, result, schemas))
+
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        futures = [executor.submit(get_tables, args, server, result['method'], schemas) for server, result, schemas in todo]
+        for (server, result, schemas), future in zip(todo, futures):
+            try:
+                tables = future.result()
+            except (OSError, ValueError, MySQLdb.Error) as e:
+                result['tables_error'] = str(e)
+                continue
+
+            result['tables'] = {}
+            for schema in schemas:
+                with conn:
+                    store_sizes(conn, result['server'], timestamp,
+                                [(schema, name, data, indexes) for name, data, indexes in tables[schema]])
+                growth = read_growth(args, conn, result['server'], schema)
+                result['tables'][schema] = sorted(((name, data, indexes, growth.get(name)) for name, data, indexes in tables[schema]),
+                                                  key=lambda table: (table[3] is None, -(table[3] or 0), -(table[1] + table[2])))
+
+def format_growth(rate):
+    # MB per day, '-' until there are two samples
+    return(f"{rate / 1024 / 1024:>+9,.1f}" if rate is not None else f"{'-':>9}")
+
+def print_tables(args, result):
+    # Drill-down of the fastest-growing schemas, fastest-growing tables first
+    if result.get('tables_error'):
+        print(f"ERROR: {result['server']}: {result['tables_error']}")
+    for schema, tables in result.get('tables', {}).items():
+        print()
+        print(f"Tables in {schema}")
+        print("Data (MB) Index (MB)   MB/day  Name")
+        for name, data, indexes, rate in tables[:TOP_TABLES]:
+            print(f"{round(data / 1024 / 1024):>8,}  {round(indexes / 1024 / 1024):>8,}  {format_growth(rate)}  {name}")
+        if len(tables) > TOP_TABLES:
+            print(f"({len(tables) - TOP_TABLES:,} more tables)")
+
+def print_table(args, results):
+    # Print the formatted output; server headings and the grand total only for several servers
+    for result in results:
+        if len(results) > 1:
+            print(f"[{result['server']}]")
+        if result['error']:
+            print(f"ERROR: {result['server']}: {result['error']}")
+        elif 'growth' in result:
+            print("Size (MB)    MB/day  Name")
+            for name, size in result['databases']:
+                print(f"{size:>8,}  {format_growth(result['growth'][name])}  {name}")
+            print("-----------------------------")
+            print(f"{result['total']:>8,}  {format_growth(result['growth_total'])}  TOTAL ({result['method']}, {result['elapsed']:.2f}s)")
+            if result['days_until_full'] is not None:
+                print(f"Full ({args.capacity:,} MB) in {result['days_until_full']:,.0f} days")
+            print_tables(args, result)
+        else:
+            print("Size (MB) Name")
+            for name, size in result['databases']:
+                print(f"{size:>8,}  {name}")
+            print("-----------------------------")
+            print(f"{result['total']:>8,}  TOTAL ({result['method']}, {result['elapsed']:.2f}s)")
+        if len(results) > 1:
+            print()
+
+    if len(results) > 1:
+        print("=============================")
+        print(f"{sum(result['total'] for result in results):>8,}  GRAND TOTAL")
+
+def print_json(results):
+    import json
+
+    # Sizes in MB per schema, data and index bytes and growth in bytes per day
+    servers = []
+    for result in results:
+        server = dict(result, databases=dict(result['databases']),
+                      schemas={name: {'data': data, 'indexes': indexes} for name, data, indexes in result['schemas']})
+        if 'tables' in result:
+            server['tables'] = {schema: [{'name': name, 'data': data, 'indexes': indexes, 'growth': rate} for name, data, indexes, rate in tables]
+                                for schema, tables in result['tables'].items()}
+        servers.append(server)
+
+    print(json.dumps({'servers': servers, 'total': sum(result['total'] for result in results)}, indent=2))
+
+def nagios_status(args, results):
+    # Thresholds apply to the total of each server; a server that cannot be queried is UNKNOWN
+    status_code = OK
+    problems = []
+    perfdata = []
+    for result in results:
+        prefix = f"{result['server']}_" if len(results) > 1 else ''
+        if result['error']:
+            status_code = max(status_code, UNKNOWN)
+            problems.append(f"{result['server']}: {result['error']}")
+            continue
+
+        if args.critical != 0 and result['total'] >= args.critical:
+            status_code = max(status_code, CRITICAL)
+            problems.append(f"{result['server']} {result['total']:,} MB >= {args.critical:,} MB")
+        elif args.warning != 0 and result['total'] >= args.warning:
+            status_code = max(status_code, WARNING)
+            problems.append(f"{result['server']} {result['total']:,} MB >= {args.warning:,} MB")
+
+        perfdata.append(f"'{prefix}total'={result['total']}MB;{args.warning or ''};{args.critical or ''}")
+        perfdata.append(f"'{prefix}elapsed'={result['elapsed']:.3f}s")
+        if result.get('growth_total') is not None:
+            perfdata.append(f"'{prefix}growth_mb_per_day'={result['growth_total'] / 1024 / 1024:.1f}")
+        if result.get('days_until_full') is not None:
+            perfdata.append(f"'{prefix}days_until_full'={result['days_until_full']:.0f}")
+        perfdata.extend(f"'{prefix}{name}'={size}MB" for name, size in result['databases'])
+
+    label = ['OK', 'WARNING', 'CRITICAL', 'UNKNOWN'][status_code]
+    total = sum(result['total'] for result in results)
+    methods = ', '.join(sorted(set(result['method'] for result in results)))
+    summary = '; '.join(problems) if problems else f"{len(results)} server{'s' if len(results) != 1 else ''}, {total:,} MB total ({methods})"
+    return(status_code, f"{label} - {summary} | {' '.join(perfdata)}")
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Display mysql database sizes with total, for one or more servers', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-f', '--config', default='.my.cnf',
+                        help="mysql connection info file (default is '.my.cnf')")
+    parser.add_argument('-s', '--section', action='append',
+                        help='config file section of a server. May be repeated\nDefault is [mysql]')
+    parser.add_argument('-a', '--all', action='store_true',
+                        help='every config file section with a host')
+    parser.add_argument('-H', '--host', action='append',
+                        help='server host[:port], using the credentials of the first section. May be repeated')
+    parser.add_argument('-P', '--parallel', default=8, type=int,
+                        help='maximum number of servers queried concurrently (default is 8)')
+    parser.add_argument('-t', '--timeout', default=10, type=int,
+                        help='connect timeout in seconds (default is 10)')
+    parser.add_argument('-m', '--method', default='full', choices=list(SIZE_METHODS),
+                        help='how sizes are read (default is full):\n'
+                             'stats  cached InnoDB statistics in mysql.innodb_table_stats, InnoDB tables only\n'
+                             'files  file sizes under the datadir: the server must run on this host, or its\n'
+                             '       config section must set datadir to where it is mounted here\n'
+                             'full   the information_schema.tables query, exact but slow on huge schemas')
+    parser.add_argument('-F', '--fallback', action='store_true',
+                        help='use the full query when the stats or files method fails or finds nothing')
+    parser.add_argument('-g', '--growth', action='store_true',
+                        help='keep a history of schema sizes and show growth rates')
+    parser.add_argument('-T', '--top', default=0, type=int,
+                        help='per-table sizes and growth of the N fastest-growing schemas of each server\n(implies --growth)')
+    parser.add_argument('--store', default='/var/tmp/dbsizes/sizes.db',
+                        help='size history database (default is /var/tmp/dbsizes/sizes.db)\nIts directory must belong to this user and not be writable by group or others')
+    parser.add_argument('--days', default=30, type=int,
+                        help='days of history used for growth rates (default is 30)')
+    parser.add_argument('--capacity', default=0, type=int,
+                        help='space available to each server in MB, for the days until full projection')
+    parser.add_argument('-o', '--output', default='table', choices=['table', 'json', 'nagios'],
+                        help='output format (default is table)')
+    parser.add_argument('-w', '--warning', default=0, type=int,
+                        help='nagios warning threshold (MB per server)')
+    parser.add_argument('-c', '--critical', default=0, type=int,
+                        help='nagios critical threshold (MB per server)')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    import configparser, sqlite3
+
+    args = define_parser().parse_args()
+
+    try:
+        servers = load_servers(args)
+        results = collect(args, servers)
+        if args.growth or args.top:
+            conn, timestamp = track_growth(args, results)
+            if args.top:
+                drill_down(args, servers, results, conn, timestamp)
+            conn.close()
+    except (OSError, ImportError, ValueError, configparser.Error, sqlite3.Error) as e:
+        print(f"{'UNKNOWN -' if args.output == 'nagios' else 'ERROR:'} {e}")
+        sys.exit(UNKNOWN if args.output == 'nagios' else 1)
+
+    if args.output == 'nagios':
+        status_code, output = nagios_status(args, results)
+        print(output)
+        sys.exit(status_code)
+
+    if args.output == 'json':
+        print_json(results)
+    else:
+        print_table(args, results)
+    sys.exit(1 if any(result['error'] for result in results) else 0)
@@ -1,26 +1,78 @@
 #!/bin/bash
 # Display mysql database sizes with total
+# Usage: dbsizes.sh [-m stats|files|full] [-d datadir]
+#   stats  cached InnoDB statistics in mysql.innodb_table_stats, InnoDB tables only
+#   files  file sizes under the datadir: the server must run on this host, or -d gives
+#          the server's datadir as mounted here
+#   full   the information_schema.tables query, exact but slow on huge schemas (default)
 # Requirements: mysql-client
 # Author: John McNally, jmcnally@acm.org, 2/2/2023
+# Version: 1.1.2, 10/18/2026
 
-RESULT=$(mysql -e 'SELECT table_schema, \
-  ROUND(SUM(data_length + index_length) / 1024 / 1024, 0) \
-  FROM information_schema.tables \
-  GROUP BY table_schema;')
+# A failed cd or du in the files pipeline must fail the whole method
+set -o pipefail
+
+METHOD=full
+DATADIR=
+while getopts "m:d:" OPTION; do
+  case $OPTION in
+    m) METHOD=$OPTARG ;;
+    d) DATADIR=$OPTARG ;;
+    *) echo "Usage: $0 [-m stats|files|full] [-d datadir]"; exit 1 ;;
+  esac
+done
+
+START=$(date +%s%N)
+
+case $METHOD in
+  stats)
+    RESULT=$(mysql -N -e 'SELECT database_name, \
+      ROUND(SUM(clustered_index_size + sum_of_other_index_sizes) * @@innodb_page_size / 1024 / 1024, 0) \
+      FROM mysql.innodb_table_stats \
+      GROUP BY database_name;')
+    ;;
+  files)
+    # One line per schema directory, the same "name<TAB>size" as the queries.
+    # @@datadir is a path on the server, so it is only used when the server runs on this host
+    if [[ -z $DATADIR ]]; then
+      IFS=$'\t' read -r SERVER_HOST DATADIR < <(mysql -N -e 'SELECT @@hostname, @@datadir;')
+      if [[ $SERVER_HOST != "$HOSTNAME" ]]; then
+        echo "ERROR: the server runs on ${SERVER_HOST:-an unknown host}, not this host; use -d datadir"
+        exit 1
+      fi
+    fi
+    [[ -n $DATADIR ]] &&
+    RESULT=$(cd "$DATADIR" && du -sm -- */ | \
+      awk -F'\t' '$2 !~ /^#/ { sub(/\/$/, "", $2); print $2 "\t" $1 }')
+    ;;
+  full)
+    RESULT=$(mysql -N -e 'SELECT table_schema, \
+      ROUND(SUM(data_length + index_length) / 1024 / 1024, 0) \
+      FROM information_schema.tables \
+      GROUP BY table_schema;')
+    ;;
+  *)
+    echo "ERROR: unknown method $METHOD"
+    exit 1
+    ;;
+esac
 
 if [[ $? -ne 0 ]]; then
-  echo "ERROR: mysql query failed"
+  echo "ERROR: $METHOD size query failed"
   exit 1
 fi
 
+ELAPSED=$(( ($(date +%s%N) - START) / 1000000 ))
 TOTAL=0
 
 echo -e "Size (MB)  Name"
 
 while IFS=$'\t' read -r NAME SIZE; do
+  [[ -z $NAME ]] && continue
+  [[ $SIZE == NULL ]] && SIZE=0
   printf "%'8d   %s\n" "$SIZE" "$NAME"
   TOTAL=$(( TOTAL + SIZE ))
-done <<< $(echo "$RESULT" | tail -n +2)
+done <<< "$RESULT"
 
 echo "-----------------------------"
-printf "%'8d   %s\n" "$TOTAL" 'TOTAL'
+printf "%'8d   %s\n" "$TOTAL" "TOTAL ($METHOD, ${ELAPSED}ms)"
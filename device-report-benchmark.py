@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# Name: device-report-benchmark.py
+# Description: Benchmark of device-report.py date formatting on synthetic Code42 computers
+#              dateutil: dateutil.parser.parse() on every lastBackup value (version 2.0)
+#              current:  format_date(), fromisoformat with an lru_cache
+# Requires: Python 3.7 or later, python3-dateutil, device-report.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.0
+# Release date: 10/18/2026
+
+import datetime, importlib.util, os, random, time
+
+FORMAT = '%m/%d/%y %I:%M %p'
+
+def load_device_report():
+    # device-report.py is not an importable module name
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device-report.py')
+    spec = importlib.util.spec_from_file_location('device_report', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return(module)
+
+def build_computers(count, distinct):
+    # Computers as /api/Computer returns them, with `distinct` different lastBackup values
+    random.seed(1)
+    offset = datetime.timezone(datetime.timedelta(hours=-4))
+    base = datetime.datetime(2026, 10, 1, tzinfo=offset)
+    dates = [(base + datetime.timedelta(seconds=random.randint(0, 86400 * 30), milliseconds=random.randint(0, 999))).isoformat(timespec='milliseconds')
+             for i in range(distinct)]
+    return([{'name': f"host{i:05d}", 'guid': str(100000 + i),
+             'backupUsage': [{'lastBackup': dates[i] if i < distinct else random.choice(dates), 'percentComplete': 100}]}
+            for i in range(count)])
+
+def format_dateutil(datestring, formatstring):
+    import dateutil.parser
+    return dateutil.parser.parse(datestring).strftime(formatstring)
+
+def measure(function, values, repeat, caches=()):
+    # Best time of `repeat` runs, each starting with empty caches
+    best = None
+    for i in range(repeat):
+        for cache in caches:
+            cache.cache_clear()
+        started = time.perf_counter()
+        for value in values:
+            function(value, FORMAT)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return(best)
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark device-report.py date formatting', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-n', '--computers', default=50000, type=int,
+                        help='number of synthetic computers. Default is 50000')
+    parser.add_argument('-d', '--distinct', default='50000,5000',
+                        help='comma-separated numbers of distinct lastBackup values. Default is 50000,5000')
+    parser.add_argument('-r', '--repeat', default=3, type=int,
+                        help='runs per measurement, the best is reported. Default is 3')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+    device_report = load_device_report()
+
+    print(f"{'computers':>9}  {'distinct':>8}  {'dateutil':>10}  {'current':>10}")
+    for distinct in [int(value) for value in args.distinct.split(',')]:
+        values = [computer['backupUsage'][0]['lastBackup'] for computer in build_computers(args.computers, min(distinct, args.computers))]
+
+        # Both must give the same report dates
+        assert all(format_dateutil(value, FORMAT) == device_report.format_date(value, FORMAT) for value in set(values))
+
+        baseline = measure(format_dateutil, values, args.repeat)
+        current = measure(device_report.format_date, values, args.repeat, (device_report.format_date, device_report.parse_date))
+        print(f"{args.computers:>9}  {distinct:>8}  {baseline:>9.3f}s  {current:>9.3f}s")
@@ -1,10 +1,32 @@
 # Name: device-report.py
 # Description: Generate Crashplan PROe device report
+#              Incremental mode reports only the changes since the last run, from a SQLite snapshot
 # Requires: Code42 CrashPlan PROe 4.2 or later
-#           Python 2.6 or later, python-requests, python-argparse, python-dateutil
+#           Python 3.7 or later, python3-requests, python3-dateutil
 # Author: John McNally, jmcnally@acm.org
-# Version: 1.0
-# Release date: 3/10/2017
+# Version: 2.2.2
+# Release date: 10/18/2026
+
+from functools import lru_cache
+
+# Report details larger than this are spooled to a temporary file instead of memory
+SPOOL_SIZE = 1024 * 1024
+
+CSV_HEADER = ['Computer', 'IP Address', 'OS Name', 'OS Version', 'Crashplan Version', 'Java Version', 'Alert State', 'Last Backup Date', 'Percent Complete']
+
+# Changes reported by the incremental report, in report order
+CHANGES = ['New Alert', 'Recovered', 'Version Change']
+
+SNAPSHOT_SCHEMA = '''CREATE TABLE IF NOT EXISTS computers (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    alert_state INTEGER,
+    last_backup TEXT,
+    percent_complete INTEGER,
+    product_version TEXT,
+    java_version TEXT,
+    run INTEGER NOT NULL
+)'''
 
 # Function - Define the parser for command-line arguments
 def define_parser():
@@ -13,12 +35,22 @@ def define_parser():
 
     parser.add_argument('-f', '--format', default='list', choices=['list', 'csv'],
                         help='format of report: list or csv (comma-separated values)')
-    parser.add_argument('-o', '--output', default='mail', choices=['mail', 'print'],
-                        help='mail -- send via email\nprint -- send to stdout')
+    parser.add_argument('-o', '--output', default='mail', choices=['mail', 'print', 'file'],
+                        help='mail -- send via email\nprint -- send to stdout\nfile -- write to the file given with --file')
+    parser.add_argument('--file', default='Crashplan Device Report.csv',
+                        help='report file for "-o file". Default is "Crashplan Device Report.csv"')
     parser.add_argument('-r', '--recipient', default='sysadmin@psfc.coop',
                         help='recipient for email output. Default is "sysadmin@psfc.coop"')
     parser.add_argument('-t', '--type', default='status', choices=['status', 'version'],
                         help='type of report: status or version')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='report only new alerts, recovered computers and version changes\nsince the last incremental run')
+    parser.add_argument('--snapshot', default='/var/tmp/device-report/snapshot.db',
+                        help='snapshot database for --incremental. Default is "/var/tmp/device-report/snapshot.db"\nIts directory must belong to this user and not be writable by group or others')
+    parser.add_argument('-p', '--page-size', default=500, type=int,
+                        help='computers requested per page. Default is 500')
+    parser.add_argument('-W', '--workers', default=4, type=int,
+                        help='pages requested concurrently. Default is 4')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='increase output verbosity')
     parser.set_defaults(func=generate_report)
@@ -26,21 +58,37 @@ def define_parser():
     return(parser)
 
 # Function - Convert date/time string to specified format
+# Code42 returns ISO 8601 timestamps (2017-03-10T14:05:00.123-05:00), which fromisoformat
+# parses directly; dateutil is only needed for anything else. Repeated values are cached.
+@lru_cache(maxsize=65536)
+def parse_date(datestring):
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(datestring)
+    except ValueError:
+        import dateutil.parser
+        return dateutil.parser.parse(datestring)
+
+@lru_cache(maxsize=65536)
 def format_date(datestring, formatstring):
-    from datetime import date
-    import dateutil.parser
-    d = dateutil.parser.parse(datestring)
-    return d.strftime(formatstring)
+    return parse_date(datestring).strftime(formatstring)
+
+# Function - Sort key of the status report: newest backup first, never backed up last
+def backup_time(computer):
+    try:
+        return parse_date(computer["backupUsage"][0]["lastBackup"]).timestamp()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return float('-inf')
 
 # Function - Send report via email
 def send_email (report, format, recipient):
     import smtplib, re
     from email.mime.multipart import MIMEMultipart
     from email.mime.text import MIMEText
-    from email.MIMEBase import MIMEBase
-    from email import Encoders
+    from email.mime.base import MIMEBase
+    from email import encoders
 
-    match = re.match('^[_a-z0-9-]+(\.[_a-z0-9-]+)*@[a-z0-9-]+(\.[a-z0-9-]+)*(\.[a-z]{2,4})$', recipient)
+    match = re.match(r'^[_a-z0-9-]+(\.[_a-z0-9-]+)*@[a-z0-9-]+(\.[a-z0-9-]+)*(\.[a-z]{2,4})$', recipient)
     if match == None:
         print('ERROR: Bad Syntax in ' + recipient)
         raise ValueError('Bad Syntax')
@@ -57,7 +105,7 @@ def send_email (report, format, recipient):
     elif format == 'csv':
         part = MIMEBase ('application', 'text')
         part.set_payload (report)
-        Encoders.encode_base64 (part)
+        encoders.encode_base64 (part)
         part.add_header ('Content-Disposition', 'attachment; filename="Crashplan Device Report.csv"')
         msg.attach (part)
 
@@ -66,117 +114,325 @@ def send_email (report, format, recipient):
     s.quit()
     return
 
-# Function - Prepare and execute the HTTP request
-def request_computers(type):
+# Function - Create the HTTP session used for every page request
+def create_session(args):
     import requests
+    from requests.adapters import HTTPAdapter
     from requests.auth import HTTPBasicAuth
-    from requests.packages.urllib3.exceptions import InsecureRequestWarning
+    from urllib3.exceptions import InsecureRequestWarning
     requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
-    HTTPParams = {
-        'status': {'srtKey': 'lastBackup', 'srtDir': 'desc'},
-        'version': {'srtKey': 'name', 'srtDir': 'asc'}
-    }
+    username = 'sysadmin@psfc.coop'
+    password = 'Balm-fiche'
+
+    # One pooled connection per concurrent page request
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(username, password)
+    session.mount('https://', HTTPAdapter(pool_maxsize=args.workers))
 
+    return(session)
+
+# Function - Prepare and execute the HTTP request for one page of computers
+def request_computers(session, page_number, page_size):
+    # Pages are fetched concurrently, so they are cut on a key that does not change while the
+    # report runs; sorting on lastBackup would shift computers between pages as backups finish
     url = 'https://backups.intranet.psfc.coop:4285/api/Computer'
     parameters = {'active': 'true',
                   'incBackupUsage': 'true',
-                  'srtKey': HTTPParams[type]['srtKey'],
-                  'srtDir': HTTPParams[type]['srtDir']}
-    username = 'sysadmin@psfc.coop'
-    password = 'Balm-fiche'
-    r = requests.get(url, params=parameters, verify=False, auth=HTTPBasicAuth(username, password))
+                  'srtKey': 'name',
+                  'srtDir': 'asc',
+                  'pgNum': page_number,
+                  'pgSize': page_size}
+    r = session.get(url, params=parameters, verify=False)
+    r.raise_for_status()
 
     # Return the response as JSON
     return (r.json())
 
-# Function - Append computer detail info to report
-def append_to_report (computer, str, format):
+# Function - Yield every active computer once, page by page in name order
+# A computer renamed or added during the run can still move across a page boundary: it is then
+# reported twice (the duplicate is dropped by guid) or missed until the next run
+def iter_computers(args):
+    import collections, math
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = create_session(args)
+    seen = set()
+
+    # The first page also tells how many pages there are
+    data = request_computers(session, 1, args.page_size)["data"]
+    pages = math.ceil(data["totalCount"] / args.page_size)
+    if args.verbose:
+        print("computers=%d, pages=%d" % (data["totalCount"], pages))
+
+    # Keep at most --workers pages in flight; pages are consumed in order as they arrive
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        pending = collections.deque()
+        next_page = 2
+        while next_page <= pages and len(pending) < args.workers:
+            pending.append(executor.submit(request_computers, session, next_page, args.page_size))
+            next_page += 1
+
+        for computer in data["computers"]:
+            seen.add(computer.get("guid") or computer["name"])
+            yield computer
+
+        while pending:
+            data = pending.popleft().result()["data"]
+            if next_page <= pages:
+                pending.append(executor.submit(request_computers, session, next_page, args.page_size))
+                next_page += 1
+            for computer in data["computers"]:
+                key = computer.get("guid") or computer["name"]
+                if key not in seen:
+                    seen.add(key)
+                    yield computer
+
+# Function - CSV columns of one computer
+def computer_row (computer):
+    return([
+        computer["name"],
+        computer["remoteAddress"].split(':')[0],
+        computer["osName"],
+        computer["osVersion"],
+        computer["productVersion"],
+        computer["javaVersion"],
+        computer["backupUsage"][0]["alertStates"][0],
+        format_date(computer["backupUsage"][0]["lastBackup"],'%m/%d/%y %I:%M %p'),
+        "%d" % computer["backupUsage"][0]["percentComplete"]])
+
+# Function - Write computer detail info to the report
+def write_computer (computer, details, writer, format):
     try:
         if format == 'list':
-            str += \
-                "Computer: %s\n" % computer["name"] + \
-                "Alert State: %s\n" % computer["backupUsage"][0]["alertStates"][0] + \
-                "OS/Version: %s/%s\n" % (computer["osName"], computer["osVersion"]) + \
-                "Last Backup Date: %s\n" % format_date(computer["backupUsage"][0]["lastBackup"],'%m/%d/%y, %I:%M %p') + \
-                "Percent Complete: %d\n\n" % computer["backupUsage"][0]["percentComplete"]
+            details.write(
+                "Computer: %s\n" % computer["name"] +
+                "Alert State: %s\n" % computer["backupUsage"][0]["alertStates"][0] +
+                "OS/Version: %s/%s\n" % (computer["osName"], computer["osVersion"]) +
+                "Last Backup Date: %s\n" % format_date(computer["backupUsage"][0]["lastBackup"],'%m/%d/%y, %I:%M %p') +
+                "Percent Complete: %d\n\n" % computer["backupUsage"][0]["percentComplete"])
         elif format == 'csv':
-            str += \
-                "%s," % computer["name"] + \
-                "%s," % computer["remoteAddress"].split(':')[0] + \
-                "%s," % computer["osName"] + \
-                "%s," % computer["osVersion"] + \
-                "%s," % computer["productVersion"] + \
-                "%s," % computer["javaVersion"] + \
-                "%s," % computer["backupUsage"][0]["alertStates"][0] + \
-                "%s," % format_date(computer["backupUsage"][0]["lastBackup"],'%m/%d/%y %I:%M %p') + \
-                "%d\n" % computer["backupUsage"][0]["percentComplete"]
-    except:
-        pass # IndexError or value missing from dictionary
-    return (str)
+            writer.writerow(computer_row(computer))
+    except (IndexError, KeyError, TypeError, ValueError):
+        pass # value missing from dictionary
+    return
+
+# Function - Write the complete report: totals (list) or header (csv), then the details
+def write_report(output, details, totals, format):
+    import csv, shutil
+
+    if format == 'list':
+        output.write(
+            "Total OK: %d\n" % totals[0] +
+            "Total Warning: %d\n" % totals[1] +
+            "Total Critical: %d\n" % totals[2])
+        if details.tell() > 0:
+            output.write(
+                "\nDETAILS\n" +
+                "----------------------------------------\n")
+    elif format == 'csv':
+        csv.writer(output, lineterminator='\n').writerow(CSV_HEADER)
+
+    details.seek(0)
+    shutil.copyfileobj(details, output)
+
+# Function - Send, print or save the report; write(output) writes it
+def output_report(args, write):
+    import io, sys
 
-def generate_report(args):
-    # Initialize global variables
-    totalOK = 0
-    totalWarning = 0
-    totalCritical = 0
-    details = ""
-    report = ""
-
-    computers = request_computers(args.type)
-
-    # Iterate through each computer in the dictionary
-    for computer in computers["data"]["computers"]:
-        if computer["alertState"] == 2:
-            totalCritical += 1
-            details = append_to_report(computer, details, args.format)
-        elif computer["alertState"] == 1:
-            totalWarning += 1
-            details = append_to_report(computer, details, args.format)
-        elif computer["alertState"] == 0:
-            totalOK += 1
-            if args.type == 'version':
-                details = append_to_report(computer, details, args.format)
-
-    # Assemble the complete report
-    if args.format == 'list':
-        report += \
-            "Total OK: %d\n" % totalOK + \
-            "Total Warning: %d\n" % totalWarning + \
-            "Total Critical: %d\n" % totalCritical
-        if details != "":
-            report += \
-                "\nDETAILS\n" + \
-                "----------------------------------------\n" + \
-                details
-    elif args.format == 'csv':
-        report += \
-            "Computer,IP Address,OS Name,OS Version,Crashplan Version,Java Version,Alert State,Last Backup Date,Percent Complete\n" + \
-            details
-
-    # Output the report
     if args.output == 'mail':
-        send_email(report, args.format, args.recipient)
+        # The message needs the whole report, so it is built only here
+        report = io.StringIO()
+        write(report)
+        send_email(report.getvalue(), args.format, args.recipient)
     elif args.output == 'print':
-        print report
+        write(sys.stdout)
+    elif args.output == 'file':
+        with open(args.file, 'w', newline='') as output:
+            write(output)
+    return
+
+def generate_report(args):
+    import csv, tempfile
+
+    if args.incremental:
+        return(generate_incremental_report(args))
+
+    # Totals by alert state: 0 OK, 1 warning, 2 critical
+    totals = {0: 0, 1: 0, 2: 0}
+
+    # Details are written as the pages arrive; the totals that head the list report are only
+    # known at the end, so the details are spooled and copied behind them
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, mode='w+', newline='') as details:
+        writer = csv.writer(details, lineterminator='\n')
+
+        # Iterate through each computer; the status report lists the newest backups first,
+        # so its alerts are sorted once all pages are in
+        alerts = []
+        for computer in iter_computers(args):
+            if computer["alertState"] in totals:
+                totals[computer["alertState"]] += 1
+            if computer["alertState"] in (1, 2) and args.type == 'status':
+                alerts.append(computer)
+            elif computer["alertState"] in (1, 2) or (computer["alertState"] == 0 and args.type == 'version'):
+                write_computer(computer, details, writer, args.format)
+        for computer in sorted(alerts, key=backup_time, reverse=True):
+            write_computer(computer, details, writer, args.format)
+
+        # Output the report
+        output_report(args, lambda output: write_report(output, details, totals, args.format))
+    return
+
+# Function - Compare a computer with its last snapshot
+def find_changes(computer, previous):
+    changes = []
+    state = computer["alertState"]
+
+    # New or escalated (warning to critical) alert
+    if state in (1, 2) and (previous is None or previous["alert_state"] is None or state > previous["alert_state"]):
+        changes.append('New Alert')
+    if previous is not None and previous["alert_state"] in (1, 2) and state == 0:
+        changes.append('Recovered')
+    if previous is not None and (previous["product_version"], previous["java_version"]) != (computer.get("productVersion"), computer.get("javaVersion")):
+        changes.append('Version Change')
+
+    return(changes)
+
+# Function - Save the current state of a computer in the snapshot
+def update_snapshot(conn, key, computer, run):
+    usage = (computer.get("backupUsage") or [{}])[0]
+    conn.execute('INSERT OR REPLACE INTO computers VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                 (key, computer.get("name"), computer.get("alertState"), usage.get("lastBackup"), usage.get("percentComplete"),
+                  computer.get("productVersion"), computer.get("javaVersion"), run))
+
+# Function - Write one change to its report section
+def write_change (change, computer, previous, details, writer, format):
+    try:
+        if format == 'list' and change == 'Version Change':
+            details.write(
+                "Computer: %s\n" % computer["name"] +
+                "Crashplan Version: %s -> %s\n" % (previous["product_version"], computer["productVersion"]) +
+                "Java Version: %s -> %s\n\n" % (previous["java_version"], computer["javaVersion"]))
+        elif format == 'list':
+            write_computer(computer, details, writer, format)
+        elif format == 'csv':
+            writer.writerow([change] + computer_row(computer) +
+                            ([previous["product_version"], previous["java_version"]] if previous is not None else ['', '']))
+    except (IndexError, KeyError, TypeError, ValueError):
+        pass # value missing from dictionary
+    return
+
+# Function - Write the incremental report: totals (list) or header (csv), then one section per change
+def write_changes(output, sections, totals, format):
+    import csv, shutil
+
+    if format == 'list':
+        output.write(
+            "Total OK: %d\n" % totals[0] +
+            "Total Warning: %d\n" % totals[1] +
+            "Total Critical: %d\n" % totals[2])
+    elif format == 'csv':
+        csv.writer(output, lineterminator='\n').writerow(['Change'] + CSV_HEADER + ['Previous Crashplan Version', 'Previous Java Version'])
+
+    for change in CHANGES:
+        if sections[change].tell() == 0:
+            continue
+        if format == 'list':
+            output.write(
+                "\n%s\n" % change.upper() +
+                "----------------------------------------\n")
+        sections[change].seek(0)
+        shutil.copyfileobj(sections[change], output)
+
+def is_trusted(st):
+    import os
+
+    # Owned by this user and not writable by group or others
+    return(st.st_uid == os.geteuid() and not st.st_mode & 0o022)
+
+# Function - Open the snapshot database, refusing one that someone else could have planted or replaced
+def open_snapshot(path):
+    import os, sqlite3, stat
+
+    snapshot_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(snapshot_dir, mode=0o700, exist_ok=True)
+    if not is_trusted(os.lstat(snapshot_dir)):
+        raise PermissionError(f"snapshot directory {snapshot_dir} must belong to this user and not be writable by others")
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        pass
+    else:
+        if not stat.S_ISREG(st.st_mode) or not is_trusted(st):
+            raise PermissionError(f"snapshot {path} must be a regular file that belongs to this user")
+
+    return(sqlite3.connect(path))
+
+def generate_incremental_report(args):
+    import contextlib, csv, sqlite3, tempfile, time
+
+    totals = {0: 0, 1: 0, 2: 0}
+    run = int(time.time())
+
+    conn = open_snapshot(args.snapshot)
+    conn.row_factory = sqlite3.Row
+    conn.execute(SNAPSHOT_SCHEMA)
+
+    with contextlib.ExitStack() as stack:
+        sections = {change: stack.enter_context(tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, mode='w+', newline=''))
+                    for change in CHANGES}
+        writers = {change: csv.writer(sections[change], lineterminator='\n') for change in CHANGES}
+
+        # The snapshot is only committed once the report has gone out, so a failed
+        # run reports the same changes again next time
+        with conn:
+            changed = []
+            for computer in iter_computers(args):
+                if computer["alertState"] in totals:
+                    totals[computer["alertState"]] += 1
+
+                key = str(computer.get("guid") or computer["name"])
+                previous = conn.execute('SELECT * FROM computers WHERE id = ?', (key,)).fetchone()
+                for change in find_changes(computer, previous):
+                    if args.type == 'status':
+                        changed.append((change, computer, previous))
+                    else:
+                        write_change(change, computer, previous, sections[change], writers[change], args.format)
+                update_snapshot(conn, key, computer, run)
+
+            # As in the full report, status changes are listed newest backup first
+            for change, computer, previous in sorted(changed, key=lambda item: backup_time(item[1]), reverse=True):
+                write_change(change, computer, previous, sections[change], writers[change], args.format)
+
+            # Computers that are no longer active leave the snapshot
+            conn.execute('DELETE FROM computers WHERE run != ?', (run,))
+
+            # Nothing is mailed when nothing changed
+            if args.output != 'mail' or any(section.tell() > 0 for section in sections.values()):
+                output_report(args, lambda output: write_changes(output, sections, totals, args.format))
+
+    conn.close()
     return
 
 def main():
     import sys, traceback
 
+    args = None
     try:
         parser = define_parser()
         args = parser.parse_args()
 
         if args.verbose:
-            print args
+            print(args)
 
         args.func(args)
-    except:
-        if args.verbose:
+    except Exception as e:
+        if args is not None and args.verbose:
             exc_type, exc_value, exc_traceback = sys.exc_info()
             lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
-            print ''.join('!! ' + line for line in lines)
+            print(''.join('!! ' + line for line in lines))
+        else:
+            print(f"ERROR: {e}", file=sys.stderr)
     return
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+# Name: ganeti_facts.py
+# Description: Cached OS and Ganeti cluster facts shared by the Ganeti checks
+#              The cache file uses KEY='value' lines so check_ganeti (bash) can read it too
+#              It lives in a directory owned by the service user and is only trusted when
+#              that user owns it and nobody else can write to it
+# Requires: Python 3.6 or later
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.1
+# Release date: 10/18/2026
+
+import os, re
+
+REDHAT_RELEASE = '/etc/redhat-release'
+SSCONF_RELEASE_VERSION = '/var/lib/ganeti/ssconf_release_version'
+SSCONF_MASTER_NODE = '/var/lib/ganeti/ssconf_master_node'
+SOURCES = [REDHAT_RELEASE, SSCONF_RELEASE_VERSION, SSCONF_MASTER_NODE]
+CACHE_DIR = '/var/tmp/ganeti_facts'
+CACHE_FILE = f"{CACHE_DIR}/facts.cache"
+
+def get_stamps():
+    # inode:mtime:size of every source file, the same as `stat -c '%i:%Y:%s'`
+    stamps = []
+    for path in SOURCES:
+        st = os.stat(path)
+        stamps.append(f"{st.st_ino}:{int(st.st_mtime)}:{st.st_size}")
+    return ' '.join(stamps)
+
+def parse_facts():
+    facts = {}
+
+    with open(REDHAT_RELEASE, "r") as file:
+        facts['OS_MAJOR_VERSION'] = re.findall('[0-9]+', file.readline())[0]
+
+    with open(SSCONF_RELEASE_VERSION, "r") as file:
+        facts['GANETI_MAJOR_VERSION'] = re.findall('[0-9]+', file.readline())[0]
+
+    with open(SSCONF_MASTER_NODE, "r") as file:
+        facts['MASTER_NODE'] = file.readline().strip()
+
+    return facts
+
+def is_trusted(st):
+    # Owned by this user and not writable by group or others
+    return st.st_uid == os.geteuid() and not st.st_mode & 0o022
+
+def read_cache(cache_file):
+    facts = {}
+    try:
+        if not is_trusted(os.lstat(os.path.dirname(cache_file))):
+            return facts
+        fd = os.open(cache_file, os.O_RDONLY | os.O_NOFOLLOW)
+        with open(fd, "r") as file:
+            if not is_trusted(os.fstat(fd)):
+                return facts
+            for line in file:
+                key, sep, value = line.rstrip('\n').partition('=')
+                if sep:
+                    facts[key] = value.strip("'")
+    except OSError:
+        pass
+    return facts
+
+def write_cache(cache_file, facts):
+    import tempfile
+
+    # Write to a temporary file and rename it, so readers never see a partial file.
+    # A cache directory someone else created is left alone and the facts are not cached.
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not is_trusted(os.lstat(cache_dir)):
+            return
+        fd, temp_file = tempfile.mkstemp(dir=cache_dir)
+        try:
+            with open(fd, "w") as file:
+                for key, value in facts.items():
+                    file.write(f"{key}='{value}'\n")
+            os.replace(temp_file, cache_file)
+        except OSError:
+            os.unlink(temp_file)
+            raise
+    except OSError:
+        pass
+
+def load(cache_file=CACHE_FILE):
+    # Only parse the source files again when one of them has changed
+    stamps = get_stamps()
+    facts = read_cache(cache_file)
+    if facts.get('STAMPS') != stamps:
+        facts = {'STAMPS': stamps}
+        facts.update(parse_facts())
+        write_cache(cache_file, facts)
+
+    return {'os_major_version': int(facts['OS_MAJOR_VERSION']),
+            'ganeti_major_version': int(facts['GANETI_MAJOR_VERSION']),
+            'master_node': facts['MASTER_NODE']}
+
+if __name__ == '__main__':
+    for key, value in load().items():
+        print(f"{key}={value}")
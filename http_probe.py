@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+# Name: http_probe.py
+# Description: Multi-probe HTTPS latency measurement for the Nagios plugins in this directory
+# Requires: Python 3.6 or later
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.1
+# Release date: 10/18/2026
+
+PERCENTILES = ['p50', 'p95', 'max']
+
+def probe(host, method, path, body=None, headers=None, count=5, timeout=10):
+    import http.client
+    import socket
+    import ssl
+    import time
+
+    # Certificates are not verified, the same as verify=False in the plugins
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+
+    samples = {'connect': [], 'tls': [], 'ttfb': [], 'total': []}
+    status = None
+    content = b''
+    conn = None
+
+    try:
+        for i in range(count):
+            # Connect and TLS handshake are only timed when a new connection is opened
+            if conn is None:
+                conn = http.client.HTTPSConnection(host, timeout=timeout, context=context)
+                started = time.perf_counter()
+                sock = socket.create_connection((conn.host, conn.port), timeout)
+                connected = time.perf_counter()
+                conn.sock = context.wrap_socket(sock, server_hostname=conn.host)
+                samples['connect'].append(connected - started)
+                samples['tls'].append(time.perf_counter() - connected)
+
+            # Time to first byte is measured up to the response headers, total up to the end of the body
+            started = time.perf_counter()
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            ttfb = time.perf_counter() - started
+            content = response.read()
+            total = time.perf_counter() - started
+            status = response.status
+
+            # An error response (401, 500) is not a latency sample and ends the probes;
+            # callers check the returned status
+            if not 200 <= status < 300:
+                break
+            samples['ttfb'].append(ttfb)
+            samples['total'].append(total)
+
+            if response.will_close:
+                conn.close()
+                conn = None
+    finally:
+        if conn is not None:
+            conn.close()
+
+    return(samples, status, content)
+
+def percentile(values, name):
+    import math
+
+    # Nearest-rank percentile
+    values = sorted(values)
+    if name == 'max':
+        return(values[-1])
+    rank = math.ceil(int(name[1:]) / 100 * len(values))
+    return(values[max(rank, 1) - 1])
+
+def summarize(samples):
+    summary = {}
+    summary['connect'] = max(samples['connect'])
+    summary['tls'] = max(samples['tls'])
+    for timing in ('ttfb', 'total'):
+        for name in PERCENTILES:
+            summary[f"{timing}_{name}"] = percentile(samples[timing], name)
+
+    return(summary)
+
+def perfdata(summary, threshold_label='', warn=0, critical=0):
+    output = []
+    for label, value in summary.items():
+        thresholds = ''
+        if label == threshold_label and (warn != 0 or critical != 0):
+            thresholds = f";{warn or ''};{critical or ''}"
+        output.append(f"{label}={value:.3f}s{thresholds}")
+
+    return(' '.join(output))
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+# Name: importtime_benchmark.py
+# Description: Startup benchmark of a script: runs it under python -X importtime and summarises
+#              the cumulative import time of every top-level import, and the wall clock
+#              With -g the script as of a git revision is measured too, for a before/after
+# Requires: Python 3.7 or later, git (only for -g)
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.0
+# Release date: 10/18/2026
+#
+# Example, os-release.py answered from its listing cache, against the version before lazy imports:
+#   importtime_benchmark.py -g 756b78c~1 os-release.py -r 9.5
+
+import os, statistics, subprocess, sys, time
+
+def run(script, script_args):
+    # Returns ({top-level import: cumulative microseconds}, wall clock seconds) of one run
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', script] + script_args,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+
+    imports = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that imported them
+        if not cumulative.strip().isdigit() or name[1:].startswith(' '):
+            continue
+        imports[name.strip()] = imports.get(name.strip(), 0) + int(cumulative)
+    return(imports, elapsed)
+
+def measure(script, script_args, repeat):
+    # One unmeasured run warms the page cache and whatever cache the script keeps
+    run(script, script_args)
+    runs = [run(script, script_args) for i in range(repeat)]
+
+    names = {name for imports, elapsed in runs for name in imports}
+    imports = {name: statistics.median(imports.get(name, 0) for imports, elapsed in runs) for name in names}
+    total = statistics.median(sum(imports.values()) for imports, elapsed in runs)
+    wall = statistics.median(elapsed for imports, elapsed in runs)
+    return(imports, total, wall)
+
+def report(label, imports, total, wall, top):
+    print(f"{label}: top-level imports {total / 1000:.1f} ms, wall clock {wall * 1000:.1f} ms (medians)")
+    for name, cumulative in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+def define_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Summarise python -X importtime of a script', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('script',
+                        help='script to measure')
+    parser.add_argument('script_args', nargs=argparse.REMAINDER,
+                        help='arguments passed to the script')
+    parser.add_argument('-g', '--git', metavar='REV',
+                        help='also measure the script as of this git revision')
+    parser.add_argument('-n', '--repeat', default=15, type=int,
+                        help='measured runs, the median is reported. Default is 15')
+    parser.add_argument('-t', '--top', default=10, type=int,
+                        help='number of top-level imports listed. Default is 10')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    if args.git:
+        # The old version runs from the script's directory, so it finds the same local modules
+        directory, name = os.path.split(os.path.abspath(args.script))
+        source = subprocess.run(['git', 'show', f"{args.git}:./{name}"], cwd=directory,
+                                stdout=subprocess.PIPE, check=True).stdout
+        old_script = os.path.join(directory, f".{name}.{args.git.replace('/', '_')}.py")
+        with open(old_script, 'wb') as file:
+            file.write(source)
+        try:
+            report(args.git, *measure(old_script, args.script_args, args.repeat), args.top)
+        finally:
+            os.unlink(old_script)
+
+    report(args.script, *measure(args.script, args.script_args, args.repeat), args.top)
@@ -1,88 +1,251 @@
 #!/usr/bin/python3
 # Name: os-release.py
 # Description: Determine if a particular release of Rocky, Alma or CentOS Linux is available
-# Requires: Python 3.10 or later, python3-lxml, python3-requests, python3-dateutil
+#              Watcher mode reports new or changed releases for a list of OS:VERSION targets
+# Requires: Python 3.10 or later, python3-requests, python3-dateutil (only for unusual date formats)
 # Author: John McNally, jmcnally@acm.org
-# Version: 1.05
-# Release date: 11/18/2023
+# Version: 1.08.1
+# Release date: 10/18/2026
 
+# requests and dateutil are imported only when they are needed, so a run answered
+# from the listing cache does not pay for them
 import sys; sys.path.insert(0, "/usr/lib/python3.6/site-packages")
 import re
-import requests
-from lxml import html
-import collections
+import collections, collections.abc
 collections.Callable = collections.abc.Callable
 
-def get_page(os):
-    # OS mirror URLs
-    urls = {
-        'Alma' : [
-            'http://nyc.mirrors.clouvider.net/almalinux/',
-            'http://mirror.cogentco.com/pub/linux/almalinux/',
-            'http://iad.mirror.rackspace.com/almalinux/',
-            'http://mirror.interserver.net/almalinux/'
-        ],
-        'CentOS' : [
-            'http://mirror.centos.org/centos/',
-            'http://mirrors.lga7.us.voxel.net/centos/',
-            'http://mirror.cc.columbia.edu/pub/linux/centos/',
-            'http://mirror.es.its.nyu.edu/centos/'
-        ],
-        'Rocky' : [
-            'http://dl.rockylinux.org/pub/rocky/',
-            'http://mirror.cogentco.com/pub/linux/rocky/',
-            'http://iad.mirror.rackspace.com/rocky/',
-            'http://nyc.mirrors.clouvider.net/rocky/'
-        ]
-    }
-
-    for url in urls[os]:
+# Directory listing patterns
+TABLE_ROW = re.compile('<tr>(.*?)</tr>', re.S)
+TABLE_CELL = re.compile('<td[^>]*>(.*?)</td>', re.S)
+LINK = re.compile('<a href="[^"]*">([^<]+)</a>')
+DATE = re.compile(r'\s\s+(.+?)\s\s+')
+
+# Date formats of the Apache and nginx listings; anything else goes to dateutil
+DATE_FORMATS = ['%Y-%m-%d %H:%M', '%d-%b-%Y %H:%M']
+
+# Directory listings are cached here and revalidated with ETag/Last-Modified
+CACHE_DIR = '/var/tmp/os-release'
+
+# Seconds a cached listing is used without asking any mirror
+CACHE_TTL = 3600
+
+# OS mirror URLs
+MIRRORS = {
+    'Alma' : [
+        'http://nyc.mirrors.clouvider.net/almalinux/',
+        'http://mirror.cogentco.com/pub/linux/almalinux/',
+        'http://iad.mirror.rackspace.com/almalinux/',
+        'http://mirror.interserver.net/almalinux/'
+    ],
+    'CentOS' : [
+        'http://mirror.centos.org/centos/',
+        'http://mirrors.lga7.us.voxel.net/centos/',
+        'http://mirror.cc.columbia.edu/pub/linux/centos/',
+        'http://mirror.es.its.nyu.edu/centos/'
+    ],
+    'Rocky' : [
+        'http://dl.rockylinux.org/pub/rocky/',
+        'http://mirror.cogentco.com/pub/linux/rocky/',
+        'http://iad.mirror.rackspace.com/rocky/',
+        'http://nyc.mirrors.clouvider.net/rocky/'
+    ]
+}
+
+def is_trusted(st):
+    import os
+
+    # Owned by this user and not writable by group or others
+    return(st.st_uid == os.geteuid() and not st.st_mode & 0o022)
+
+def load_cache(os_name):
+    import json, os
+
+    # A cache directory or file someone else could have planted is a cache miss
+    try:
+        if not is_trusted(os.lstat(CACHE_DIR)):
+            return({})
+        fd = os.open(f"{CACHE_DIR}/{os_name}.json", os.O_RDONLY | os.O_NOFOLLOW)
+        with open(fd, "r") as file:
+            if not is_trusted(os.fstat(fd)):
+                return({})
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return({})
+
+    return(cache if isinstance(cache, dict) else {})
+
+def save_cache(os_name, cache):
+    import json, os, tempfile
+
+    # Write to a temporary file and rename it, so readers never see a partial file.
+    # A cache directory someone else created is left alone and the listing is not cached.
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        if not is_trusted(os.lstat(CACHE_DIR)):
+            return
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=f"{os_name}.")
         try:
-            page = requests.get(url, timeout=10)
-            return(str(page.content))
-        except:
-            # Unable to connect to any URL
-            return None
-
-def parse_structured(page, os, target_version):
-    tree = html.fromstring(page)
-    versions = tree.xpath('//tr/td[2]/a/text()')
-    dates = tree.xpath('//tr/td[3]/text()')
-
-    for i in range(len(versions)):
-        if target_version in versions[i]:
-            version = versions[i].strip('/')
-            date = format_date(dates[i].strip(),'%B %-d, %Y at %-I:%M %p')
-            print(f"{os} {version} was released or updated on {date}")
-
-def parse_unstructured(page, os, target_version):
-    lines = page.split("\r\n")
-
-    for line in lines:
-        if (target_version in line) and ('RC' not in line):
-            m = re.search('\s\s+(.+?)\s\s+', line)
-            if m:
-                date = format_date(m.group(1), '%B %-d, %Y at %-I:%M %p')
-                print (f"{os} {target_version} was released or updated on {date}")
-            else:
-                print (f"{os} {target_version} was released or updated, date undetermined")
+            with open(fd, "w") as file:
+                json.dump(cache, file)
+            os.replace(temp_path, f"{CACHE_DIR}/{os_name}.json")
+        except OSError:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        pass
+
+def fetch(url, cache, results):
+    import requests
+
+    # Conditional GET if the cached listing came from this mirror
+    headers = {}
+    if cache.get('url') == url:
+        if cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+
+    try:
+        results.put((url, requests.get(url, headers=headers, timeout=10)))
+    except Exception:
+        results.put((url, None))
+
+def get_page(os):
+    import queue, threading, time
+
+    # A truncated or foreign cache file is a miss, like one that is not JSON
+    cache = load_cache(os)
+    if not isinstance(cache.get('fetched'), (int, float)) or not isinstance(cache.get('content'), str):
+        cache = {}
+    if cache and time.time() - cache['fetched'] < CACHE_TTL:
+        return(cache['content'])
+
+    # Ask every mirror at once and use the first healthy answer; the slower
+    # requests run in daemon threads, so they don't delay the exit. requests is imported
+    # here, in the main thread, before the fetch threads start: otherwise they would all
+    # import it at once, serialised on the import lock
+    import requests
+    results = queue.Queue()
+    for url in MIRRORS[os]:
+        threading.Thread(target=fetch, args=(url, cache, results), daemon=True).start()
+
+    for i in range(len(MIRRORS[os])):
+        url, page = results.get()
+        if page is None:
+            continue
+        if page.status_code == 304 and cache.get('url') == url:
+            cache['fetched'] = time.time()
+            save_cache(os, cache)
+            return(cache['content'])
+        if page.status_code == 200 and page.text:
+            save_cache(os, {'url': url,
+                            'etag': page.headers.get('ETag'),
+                            'last_modified': page.headers.get('Last-Modified'),
+                            'fetched': time.time(),
+                            'content': page.text})
+            return(page.text)
+
+    # Unable to connect to any URL; a stale listing is better than none
+    return(cache.get('content'))
+
+def parse_structured(page):
+    # Apache table listing, the link in the second cell and the date in the third: {version: date}
+    index = {}
+    for row in TABLE_ROW.finditer(page):
+        cells = TABLE_CELL.findall(row.group(1))
+        link = LINK.search(cells[1]) if len(cells) > 2 else None
+        if link:
+            index[link.group(1).strip('/')] = cells[2].strip()
+
+    return(index)
+
+def parse_unstructured(page):
+    # Preformatted (nginx) listing, one release per line: {version: date or None}
+    index = {}
+    for line in page.splitlines():
+        link = LINK.search(line)
+        if link is None or link.group(1) == '../' or 'RC' in line:
+            continue
+        m = DATE.search(line)
+        index[link.group(1).strip('/')] = m.group(1) if m else None
+
+    return(index)
+
+def parse_index(page, os):
+    if os == 'CentOS':
+        return(parse_structured(page))
+    return(parse_unstructured(page))
+
+def find_releases(index, target_version):
+    return([(version, date) for version, date in index.items() if target_version in version])
+
+def release_message(os, version, date):
+    if date is None:
+        return(f"{os} {version} was released or updated, date undetermined")
+    return(f"{os} {version} was released or updated on {format_date(date, '%B %-d, %Y at %-I:%M %p')}")
+
+def watch(targets):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Fetch and parse every OS listing once, then answer all targets from the indexes
+    oses = sorted(set(os for os, target_version in targets))
+    with ThreadPoolExecutor(max_workers=len(oses)) as executor:
+        pages = dict(zip(oses, executor.map(get_page, oses)))
+    indexes = {os: parse_index(page, os) for os, page in pages.items() if page is not None}
+
+    # Only report releases that are new or changed since the last run
+    state = load_cache('watch')
+    status = 0
+    for os, target_version in targets:
+        if os not in indexes:
+            print(f"ERROR: Unable to connect to any {os} mirror")
+            status = 1
+            continue
+        for version, date in find_releases(indexes[os], target_version):
+            if state.get(f"{os} {version}", '') != date:
+                print(release_message(os, version, date))
+                state[f"{os} {version}"] = date
+    save_cache('watch', state)
+
+    return(status)
 
 def format_date(datestring, formatstring):
-    from datetime import date
+    from datetime import datetime
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(datestring, date_format).strftime(formatstring)
+        except ValueError:
+            pass
+
     import dateutil.parser
     d = dateutil.parser.parse(datestring)
     return d.strftime(formatstring)
 
 def usage():
-    print ("usage: os-release.py [ [ -a | -c | -r ] VERSION ] | -h ]\n \
+    print ("usage: os-release.py [ [ -a | -c | -r ] VERSION ] | -w OS:VERSION [OS:VERSION ...] | -h ]\n \
     -a           OS AlmaLinux\n \
     -c           OS CentOS\n \
     -r           OS Rocky Linux\n \
     VERSION	 target OS version (n.n)\n \
+    -w           watch OS:VERSION targets (OS is Alma, CentOS or Rocky) and\n \
+                 report only releases that are new or changed since the last run\n \
     -h           show this help message and exit")
 
 # MAIN()
 
+if len(sys.argv) >= 3 and sys.argv[1] == '-w':
+    targets = []
+    for target in sys.argv[2:]:
+        os, sep, target_version = target.partition(':')
+        os = {name.lower(): name for name in MIRRORS}.get(os.lower())
+        if os is None or not target_version:
+            print(f"ERROR: invalid target {target}, must be OS:VERSION with OS Alma, CentOS or Rocky")
+            sys.exit(1)
+        targets.append((os, target_version))
+
+    sys.exit(watch(targets))
+
 if len(sys.argv) == 3:
     if sys.argv[1] == '-h':
         usage()
@@ -107,7 +270,5 @@ if page is None:
     print (f"ERROR: Unable to connect to any {os} mirror")
     sys.exit(1)
 
-if os == 'CentOS':
-    parse_structured(page, os, target_version)
-else:
-    parse_unstructured(page, os, target_version)
+for version, date in find_releases(parse_index(page, os), target_version):
+    print(release_message(os, version, date))
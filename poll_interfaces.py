@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+# Name: poll_interfaces.py
+# Description: Poll every interface of one or more devices with a single ifTable/ifXTable
+#              GetBulk walk per device, and report each interface as a Nagios passive
+#              result (or check_interface.py-style lines on stdout)
+# Requires: Python 3.6 or later, snmp_client.py, check_interface.py, counter_store.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.2.2
+# Release date: 10/18/2026
+#
+# Config file example:
+#   [switch1.example.com]
+#   community = public
+#   warning = 500000000
+#   critical = 900000000
+#   # warn when traffic drops this many percent below its recent average (default 90, 0 disables)
+#   cliff = 90
+#   # optional, default is every interface that is administratively up
+#   interfaces = GigabitEthernet0/1, GigabitEthernet0/2
+#   # passive service that gets an UNKNOWN result when the device cannot be polled and no
+#   # interfaces are listed above (default "Interface poller")
+#   poll_service = Interface poller
+#
+#   [switch1.example.com:GigabitEthernet0/1]
+#   warning = 800000000
+#   critical = 950000000
+
+import argparse, sys, time
+import check_interface
+import snmp_client
+
+# Columns walked together, keyed by the field names check_interface.do_status() expects
+COLUMNS = {'descr': check_interface.IF_DESCR,
+           'ifadminstatus': check_interface.IF_ADMIN_STATUS,
+           'ifstatus': check_interface.IF_OPER_STATUS,
+           'received': check_interface.IF_HC_IN_OCTETS,
+           'sent': check_interface.IF_HC_OUT_OCTETS}
+
+def load_devices(args):
+    import configparser
+
+    config_object = configparser.ConfigParser(interpolation=None)
+    config_object.optionxform = str
+    with open(args.config, "r") as file_object:
+        config_object.read_file(file_object)
+
+    devices = []
+    for section in config_object.sections():
+        if ':' in section:
+            continue
+        device = config_object[section]
+        interfaces = [descr.strip() for descr in device.get('interfaces', '').split(',') if descr.strip()]
+        thresholds = {}
+        for other in config_object.sections():
+            if other.startswith(f"{section}:"):
+                thresholds[other.split(':', 1)[1]] = (config_object.getint(other, 'warning', fallback=device.getint('warning', 0)),
+                                                     config_object.getint(other, 'critical', fallback=device.getint('critical', 0)))
+        devices.append({'hostname': section,
+                        'community': device.get('community', 'public'),
+                        'port': device.getint('port', 161),
+                        'warning': device.getint('warning', 0),
+                        'critical': device.getint('critical', 0),
+                        'cliff': device.getint('cliff', 90),
+                        'interfaces': interfaces,
+                        'thresholds': thresholds,
+                        'nagios_host': device.get('nagios_host', section),
+                        'service': device.get('service', 'Interface {descr}'),
+                        'poll_service': device.get('poll_service', 'Interface poller')})
+
+    return(devices)
+
+def poll_device(args, device):
+    # One GetBulk walk over all columns returns every interface of the device
+    table = snmp_client.walk(device['hostname'], device['community'], list(COLUMNS.values()),
+                             max_repetitions=args.max_repetitions, port=device['port'], timeout=args.timeout)
+    timestamp = int(time.time())
+
+    interfaces = {}
+    for field, column in COLUMNS.items():
+        for oid, value in table[column]:
+            ifindex = int(oid[len(column) + 1:])
+            interfaces.setdefault(ifindex, {'ifindex': ifindex, 'timestamp': timestamp,
+                                            'received': None, 'sent': None})[field] = value
+
+    for interface in interfaces.values():
+        interface['ifadminstatus'] = check_interface.IF_STATUS.get(interface.get('ifadminstatus'), 'unknown')
+        interface['ifstatus'] = check_interface.IF_STATUS.get(interface.get('ifstatus'), 'unknown')
+
+    # The counters of every interface on the device are stored in one transaction
+    device_args = argparse.Namespace(hostname=device['hostname'], file=args.file)
+    history = check_interface.store_counters(device_args, interfaces.values())
+
+    results = []
+    for ifindex, interface in sorted(interfaces.items()):
+        descr = interface.get('descr')
+
+        if device['interfaces']:
+            if descr not in device['interfaces']:
+                continue
+        elif interface['ifadminstatus'] != 'up':
+            continue
+
+        # Evaluate the interface exactly as check_interface.py does, sharing its counter store
+        warning, critical = device['thresholds'].get(descr, (device['warning'], device['critical']))
+        check_args = argparse.Namespace(hostname=device['hostname'], community=device['community'],
+                                        descr=[descr], file=args.file, warning=warning, critical=critical,
+                                        cliff=device['cliff'], verbose=args.verbose)
+        status_code, output = check_interface.do_status(check_args, descr, interface, history[ifindex])
+        results.append((descr, status_code, output))
+
+    for descr in device['interfaces']:
+        if descr not in [result[0] for result in results]:
+            results.append((descr, check_interface.UNKNOWN, f"ERROR - Interface {descr} not found."))
+
+    return(results)
+
+def poll_devices(args, devices):
+    import sqlite3
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Poll the devices concurrently, at most --parallel at a time
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        futures = [executor.submit(poll_device, args, device) for device in devices]
+        results = []
+        for device, future in zip(devices, futures):
+            try:
+                results.append((device, future.result()))
+            except (OSError, sqlite3.Error, snmp_client.SnmpError) as e:
+                # Report every configured interface as UNKNOWN, or the device itself if none are listed
+                output = f"UNKNOWN - {e}"
+                results.append((device, [(descr, check_interface.UNKNOWN, output) for descr in device['interfaces']]
+                                        or [(None, check_interface.UNKNOWN, output)]))
+
+    return(results)
+
+def submit_results(args, results):
+    commands = ''
+    for device, interfaces in results:
+        for descr, status_code, output in interfaces:
+            service = device['poll_service'] if descr is None else device['service'].format(descr=descr)
+            commands += f"[{int(time.time())}] PROCESS_SERVICE_CHECK_RESULT;{device['nagios_host']};{service};{status_code};{output}\n"
+
+    # Write all passive check results to the Nagios external command file at once
+    try:
+        with open(args.command_file, 'w') as command_file:
+            command_file.write(commands)
+    except OSError as e:
+        print(f"UNKNOWN - Unable to write to {args.command_file}: {e}")
+        sys.exit(check_interface.UNKNOWN)
+
+def qualify(device, descr, output):
+    # Prefix the text and every perfdata label with the device and interface, so the labels
+    # stay unique once check_interface.print_results() joins the perfdata of all interfaces
+    name = device['hostname'] if descr is None else f"{device['hostname']} {descr}"
+    text, sep, data = output.partition(' | ')
+    if data:
+        data = ', '.join(f"'{name} {label}'={value}" for label, value in
+                         (item.split('=', 1) for item in data.split(', ')))
+    return(f"{name}: {text}" + (f" | {data}" if data else ''))
+
+def define_parser():
+    parser = argparse.ArgumentParser(description='Poll all interfaces of one or more devices in one pass', formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument('-f', '--config', required=True,
+                        help='config file with one section per device and optional\n[device:interface] sections for per-interface thresholds')
+    parser.add_argument('-s', '--state', dest='file', default='/tmp',
+                        help='directory of the counter database (default is /tmp/)')
+    parser.add_argument('--command-file', default=None,
+                        help='Nagios external command file for passive check results\nDefault is to print one line per interface')
+    parser.add_argument('-P', '--parallel', default=8, type=int,
+                        help='maximum number of devices polled concurrently (default is 8)')
+    parser.add_argument('-r', '--max-repetitions', default=25, type=int,
+                        help='GetBulk max-repetitions (default is 25)')
+    parser.add_argument('-t', '--timeout', default=2, type=float,
+                        help='SNMP timeout in seconds (default is 2)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show verbose output')
+
+    return(parser)
+
+# MAIN()
+if __name__ == '__main__':
+    args = define_parser().parse_args()
+
+    results = poll_devices(args, load_devices(args))
+
+    if args.command_file:
+        submit_results(args, results)
+    else:
+        # Worst interface first with the perfdata of all interfaces, the rest as long output
+        lines = [(status_code, qualify(device, descr, output))
+                 for device, interfaces in results for descr, status_code, output in interfaces]
+        if not lines:
+            print("OK - no interfaces to report")
+            sys.exit(check_interface.OK)
+        sys.exit(check_interface.print_results(lines))
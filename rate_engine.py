@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# Name: rate_engine.py
+# Description: Smoothed rates, rate of change and anomaly detection over the counter history
+#              kept by counter_store.py, for the interface and BGP checks
+# Requires: Python 3.6 or later, counter_store.py
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.0
+# Release date: 10/18/2026
+
+import counter_store
+
+# Weight of the newest value in the exponentially weighted moving average
+EWMA_ALPHA = 0.3
+
+def ewma(values, alpha=EWMA_ALPHA):
+    average = None
+    for value in values:
+        average = value if average is None else alpha * value + (1 - alpha) * average
+    return(average)
+
+def change(value, baseline):
+    # Relative change against the baseline, -1.0 is a drop to zero
+    if not baseline:
+        return(None)
+    return((value - baseline) / baseline)
+
+def counter_rates(samples, bits=64):
+    # Per-second (rate_in, rate_out) for every interval between samples (oldest first).
+    # Wraps are corrected; a reset starts the series again, as rates across it are meaningless.
+    rates = []
+    for previous, current in zip(samples, samples[1:]):
+        result = counter_store.deltas(previous, current, bits)
+        if result is None:
+            rates = []
+            continue
+        elapsed, delta_in, delta_out = result
+        if elapsed > 0:
+            rates.append((delta_in / elapsed, delta_out / elapsed))
+    return(rates)
+
+def analyze_counter(history, current, bits=64, alpha=EWMA_ALPHA):
+    # Return the latest rates, their EWMA and the change against the EWMA of the earlier
+    # intervals (the baseline), or None if the counter was reset since the previous sample
+    previous = history[-1] if history else None
+    result = counter_store.deltas(previous, current, bits)
+    if result is None:
+        return(None)
+
+    # A sample in the same second as the previous one (overlapping checks, a quick re-check)
+    # has no interval of its own; it repeats the previous rates without a change, so callers
+    # skip the drop test instead of seeing a drop to zero
+    elapsed = result[0]
+    rates = counter_rates(history + [current], bits)
+    rate_in, rate_out = rates[-1] if rates else (0, 0)
+    baseline = rates[:-1]
+
+    baseline_in = ewma([rate[0] for rate in baseline], alpha)
+    baseline_out = ewma([rate[1] for rate in baseline], alpha)
+
+    return({'rate_in': rate_in,
+            'rate_out': rate_out,
+            'ewma_in': ewma([rate[0] for rate in rates], alpha) or 0,
+            'ewma_out': ewma([rate[1] for rate in rates], alpha) or 0,
+            'baseline_in': baseline_in,
+            'baseline_out': baseline_out,
+            'change_in': change(rate_in, baseline_in) if elapsed > 0 else None,
+            'change_out': change(rate_out, baseline_out) if elapsed > 0 else None})
+
+def analyze_gauge(history, current, alpha=EWMA_ALPHA):
+    # Gauges (prefix counts) are compared as values, not rates
+    baseline = ewma(history, alpha)
+    return({'value': current,
+            'ewma': ewma(history + [current], alpha),
+            'baseline': baseline,
+            'change': change(current, baseline)})
+
+def is_drop(value_change, baseline, percent, minimum=0):
+    # A drop of at least `percent` from a baseline of at least `minimum`; 0 percent disables the test
+    return(percent != 0 and baseline is not None and baseline >= minimum and
+           value_change is not None and value_change <= -percent / 100)
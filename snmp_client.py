@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+# Name: snmp_client.py
+# Description: Minimal SNMPv2c client (Get, GetNext, GetBulk) over UDP for the SNMP plugins in this directory
+# Requires: Python 3.6 or later
+# Author: John McNally, jmcnally@acm.org
+# Version: 1.0.1
+# Release date: 10/18/2026
+
+import random, socket
+
+# BER tags
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+# PDU types
+GET_REQUEST = 0xa0
+GET_NEXT_REQUEST = 0xa1
+RESPONSE = 0xa2
+GET_BULK_REQUEST = 0xa5
+
+SNMP_VERSION_2C = 1
+
+ERROR_STATUS = ['noError', 'tooBig', 'noSuchName', 'badValue', 'readOnly', 'genErr',
+                'noAccess', 'wrongType', 'wrongLength', 'wrongEncoding', 'wrongValue',
+                'noCreation', 'inconsistentValue', 'resourceUnavailable', 'commitFailed',
+                'undoFailed', 'authorizationError', 'notWritable', 'inconsistentName']
+
+class SnmpError(Exception):
+    pass
+
+def encode_length(length):
+    if length < 0x80:
+        return bytes([length])
+    octets = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(octets)]) + octets
+
+def encode_tlv(tag, value):
+    return bytes([tag]) + encode_length(len(value)) + value
+
+def encode_integer(value, tag=INTEGER):
+    length = max(1, (value.bit_length() + 8) // 8)
+    return encode_tlv(tag, value.to_bytes(length, 'big', signed=True))
+
+def encode_oid(oid):
+    subids = [int(subid) for subid in oid.strip('.').split('.')]
+    content = bytearray([40 * subids[0] + subids[1]])
+    for subid in subids[2:]:
+        chunk = [subid & 0x7f]
+        subid >>= 7
+        while subid:
+            chunk.insert(0, 0x80 | (subid & 0x7f))
+            subid >>= 7
+        content.extend(chunk)
+    return encode_tlv(OBJECT_IDENTIFIER, bytes(content))
+
+def oid_key(oid):
+    return tuple(int(subid) for subid in oid.strip('.').split('.'))
+
+def decode_tlv(data, pos):
+    # Return (tag, value, position after the value); a truncated or oversized field is an error
+    if pos + 2 > len(data):
+        raise SnmpError(f"truncated packet at offset {pos}")
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        if count == 0 or count > 4 or pos + count > len(data):
+            raise SnmpError(f"invalid length of tag 0x{tag:02x} at offset {pos - 2}")
+        length = int.from_bytes(data[pos:pos + count], 'big')
+        pos += count
+    if pos + length > len(data):
+        raise SnmpError(f"tag 0x{tag:02x} at offset {pos} overruns the packet ({length} bytes, {len(data) - pos} left)")
+    return tag, data[pos:pos + length], pos + length
+
+def decode_oid(value):
+    if not value:
+        raise SnmpError("empty object identifier")
+    subids = [value[0] // 40, value[0] % 40]
+    subid = 0
+    for octet in value[1:]:
+        subid = (subid << 7) | (octet & 0x7f)
+        if not octet & 0x80:
+            subids.append(subid)
+            subid = 0
+    return '.'.join(str(subid) for subid in subids)
+
+def decode_value(tag, value):
+    if tag == INTEGER:
+        return int.from_bytes(value, 'big', signed=True)
+    elif tag in (COUNTER32, GAUGE32, TIMETICKS, COUNTER64):
+        return int.from_bytes(value, 'big')
+    elif tag == OCTET_STRING:
+        return value.decode('utf-8', 'replace')
+    elif tag == OBJECT_IDENTIFIER:
+        return decode_oid(value)
+    elif tag == IP_ADDRESS:
+        return '.'.join(str(octet) for octet in value)
+    elif tag == OPAQUE:
+        return bytes(value)
+    else:
+        # NULL, noSuchObject, noSuchInstance and endOfMibView
+        return None
+
+def encode_request(pdu_type, request_id, community, oids, field1=0, field2=0):
+    # field1/field2 are error-status/error-index, or non-repeaters/max-repetitions for GetBulk
+    varbinds = b''.join(encode_tlv(SEQUENCE, encode_oid(oid) + encode_tlv(NULL, b'')) for oid in oids)
+    pdu = encode_tlv(pdu_type, encode_integer(request_id) +
+                               encode_integer(field1) +
+                               encode_integer(field2) +
+                               encode_tlv(SEQUENCE, varbinds))
+    return encode_tlv(SEQUENCE, encode_integer(SNMP_VERSION_2C) +
+                                encode_tlv(OCTET_STRING, community.encode()) +
+                                pdu)
+
+def decode_response(data):
+    # Return (request_id, error_status, error_index, [(oid, tag, value), ...])
+    tag, message, pos = decode_tlv(data, 0)
+    tag, version, pos = decode_tlv(message, 0)
+    tag, community, pos = decode_tlv(message, pos)
+    pdu_type, pdu, pos = decode_tlv(message, pos)
+    if pdu_type != RESPONSE:
+        raise SnmpError(f"unexpected PDU type 0x{pdu_type:02x}")
+
+    tag, request_id, pos = decode_tlv(pdu, 0)
+    tag, error_status, pos = decode_tlv(pdu, pos)
+    tag, error_index, pos = decode_tlv(pdu, pos)
+    tag, varbind_list, pos = decode_tlv(pdu, pos)
+
+    varbinds = []
+    pos = 0
+    while pos < len(varbind_list):
+        tag, varbind, pos = decode_tlv(varbind_list, pos)
+        tag, oid, value_pos = decode_tlv(varbind, 0)
+        value_tag, value, value_pos = decode_tlv(varbind, value_pos)
+        varbinds.append((decode_oid(oid), value_tag, decode_value(value_tag, value)))
+
+    return (int.from_bytes(request_id, 'big', signed=True),
+            int.from_bytes(error_status, 'big'),
+            int.from_bytes(error_index, 'big'),
+            varbinds)
+
+def request(host, community, pdu_type, oids, field1=0, field2=0, timeout=2, retries=1, port=161):
+    request_id = random.randint(1, 0x7fffffff)
+    message = encode_request(pdu_type, request_id, community, oids, field1, field2)
+
+    with socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect((host, port))
+        for attempt in range(retries + 1):
+            sock.send(message)
+            try:
+                while True:
+                    response_id, error_status, error_index, varbinds = decode_response(sock.recv(65535))
+                    # Ignore late replies to an earlier attempt
+                    if response_id == request_id:
+                        break
+            except socket.timeout:
+                continue
+            if error_status:
+                name = ERROR_STATUS[error_status] if error_status < len(ERROR_STATUS) else str(error_status)
+                raise SnmpError(f"{name} at index {error_index}")
+            return varbinds
+
+    raise SnmpError(f"no response from {host}")
+
+def get(host, community, oids, **kwargs):
+    # One GetRequest for all OIDs; missing objects are returned as None
+    return {oid: value for oid, tag, value in request(host, community, GET_REQUEST, oids, **kwargs)}
+
+def get_bulk(host, community, oids, non_repeaters=0, max_repetitions=25, **kwargs):
+    return request(host, community, GET_BULK_REQUEST, oids, non_repeaters, max_repetitions, **kwargs)
+
+def walk(host, community, oids, max_repetitions=25, **kwargs):
+    # Walk one or more table columns together with GetBulk; returns {column: [(oid, value), ...]}
+    columns = [oid.strip('.') for oid in oids]
+    results = {column: [] for column in columns}
+    current = dict(zip(columns, columns))
+
+    while current:
+        varbinds = get_bulk(host, community, list(current.values()), max_repetitions=max_repetitions, **kwargs)
+        if not varbinds:
+            break
+        # Varbinds repeat the requested columns in order for each repetition
+        active = list(current)
+        for i, (oid, tag, value) in enumerate(varbinds):
+            column = active[i % len(active)]
+            if column not in current:
+                continue
+            # Stop at the end of the column, or if the agent does not move forward
+            if tag == END_OF_MIB_VIEW or not oid.startswith(column + '.') or oid_key(oid) <= oid_key(current[column]):
+                del current[column]
+                continue
+            results[column].append((oid, value))
+            current[column] = oid
+
+    return results